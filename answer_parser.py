@@ -0,0 +1,406 @@
+# Sudoku4LLM/answer_parser.py
+
+import functools
+import itertools
+import json
+import re
+
+from config import SudokuConfig  # Sub-grid shapes and conversion formats
+from formatters import get_formatter  # Layouts of the formats, for the batch fast path
+
+np = None  # NumPy is only needed for batch parsing and validation, see require_numpy
+
+CELL_TOKEN = re.compile(r"^(?:\d{1,2}|[A-Za-z]|[._*?])$")  # One cell of a grid-shaped answer
+INLINE_RUN = re.compile(r"[0-9A-Za-z._*?]+")
+FENCED_BLOCK = re.compile(r"```[^\n]*\n(.*?)```", re.DOTALL)
+COORDINATE_ENTRY = re.compile(r"\(\s*(\d+)\s*,\s*(\d+)\s*,\s*['\"]?([^'\"\s,)]+)['\"]?\s*\)")
+SPARSE_ENTRY = re.compile(r"\(\s*(\d+)\s*,\s*(\d+)\s*\)\s*=\s*['\"]?([^'\"\s,)]+)")
+KEYED_ENTRY = re.compile(r"['\"]?\b([A-Za-z])(\d+)['\"]?\s*:\s*['\"]?([^'\"\s,}]+)")
+BARE_TOKEN = re.compile(r"(?<![\"'\w])([A-Za-z._*?])(?![\"'\w])")  # Unquoted letter or placeholder cell
+XML_ROW = re.compile(r"<row\b[^>]*?index=['\"]?(\d+)['\"]?[^>]*>(.*?)</row>", re.DOTALL)
+QUOTED_CELL = re.compile(r"([\"'])([^\"'\s])\1")  # One quoted character, such as "A" or '0'
+LAYOUT_MARKER = "#"  # Cell value rendered as one character in every format, to find the cell positions
+BLOCK_SIZE = 65536  # Answers parsed or validated per vectorized block
+
+
+def parse_cell(value, grid_size):
+    """
+    Number of a cell token: digits as ints, letters as 10, 11, ... in grids larger than
+    9x9 (see SudokuConfig.get_digit_symbol), 0 for placeholders and anything else.
+    """
+    if type(value) is int:
+        return value if value >= 0 else 0
+    token = str(value).strip().strip("'\"")
+    if token.isdigit():
+        return int(token)
+    if grid_size > 9 and len(token) == 1 and token.isalpha():
+        return ord(token.upper()) - ord("A") + 10
+    return 0
+
+
+def iter_json_values(text, opener):
+    # Every JSON value in text that starts with the opener character, in order
+    decoder = json.JSONDecoder()
+    position = text.find(opener)
+    while position != -1:
+        try:
+            value, end = decoder.raw_decode(text, position)
+        except json.JSONDecodeError:
+            position = text.find(opener, position + 1)
+            continue
+        yield value
+        position = text.find(opener, end)
+
+
+def json_grids(text, opener, accept):
+    # JSON values accepted as grids, reading unquoted letter and placeholder cells as strings
+    # when the text as written holds none
+    for candidate in (text, BARE_TOKEN.sub(r'"\1"', text)):
+        grids = [value for value in iter_json_values(candidate, opener) if accept(value)]
+        if grids:
+            return grids
+    return []
+
+
+def last_rows(rows, grid_size):
+    # The last grid_size rows found in an answer; earlier ones are usually the echoed puzzle
+    if len(rows) < grid_size:
+        raise ValueError(f"Expected {grid_size} rows, found {len(rows)}.")
+    return [[parse_cell(cell, grid_size) for cell in row] for row in rows[-grid_size:]]
+
+
+def keyed_grid(entries, grid_size):
+    # Grid from (row, column, value) entries with 1-based indices; later entries win
+    grid = [[0] * grid_size for _ in range(grid_size)]
+    found = False
+    for row, col, value in entries:
+        if not (1 <= row <= grid_size and 1 <= col <= grid_size):
+            raise ValueError(f"Cell ({row}, {col}) is outside the {grid_size}x{grid_size} grid.")
+        grid[row - 1][col - 1] = parse_cell(value, grid_size)
+        found = True
+    if not found:
+        raise ValueError("No cells found.")
+    return grid
+
+
+def parse_inline_string(text, grid_size):
+    runs = [run for run in INLINE_RUN.findall(text) if len(run) == grid_size * grid_size]
+    if not runs:
+        raise ValueError(f"No string of {grid_size * grid_size} cells found.")
+    run = runs[-1]
+    return [[parse_cell(cell, grid_size) for cell in run[i:i + grid_size]] for i in range(0, len(run), grid_size)]
+
+
+def parse_row_by_row(text, grid_size):
+    grids = json_grids(text, "[", lambda value: isinstance(value, list) and len(value) == grid_size
+                       and all(isinstance(row, list) and len(row) == grid_size for row in value))
+    if not grids:
+        raise ValueError(f"No {grid_size}x{grid_size} JSON list found.")
+    return last_rows(grids[-1], grid_size)
+
+
+def parse_key_value_row(text, grid_size):
+    keys = [f"row_{i + 1}" for i in range(grid_size)]
+    grids = json_grids(text, "{", lambda value: isinstance(value, dict) and all(
+        isinstance(value.get(key), list) and len(value[key]) == grid_size for key in keys
+    ))
+    if not grids:
+        raise ValueError(f"No JSON object with keys row_1 to row_{grid_size} found.")
+    return last_rows([grids[-1][key] for key in keys], grid_size)
+
+
+def parse_grid_with_separators(text, grid_size):
+    # Also reads the Box-Oriented Format: separator lines are skipped
+    rows = []
+    for line in text.splitlines():
+        cells = line.replace("|", " ").split()
+        if len(cells) == grid_size and all(CELL_TOKEN.match(cell) for cell in cells):
+            rows.append(cells)
+    return last_rows(rows, grid_size)
+
+
+def parse_csv(text, grid_size):
+    rows = []
+    for line in text.splitlines():
+        cells = [cell.strip() for cell in line.split(",")]
+        if len(cells) == grid_size and all(CELL_TOKEN.match(cell) for cell in cells):
+            rows.append(cells)
+    return last_rows(rows, grid_size)
+
+
+def parse_coordinate_list(text, grid_size):
+    return keyed_grid(((int(r), int(c), v) for r, c, v in COORDINATE_ENTRY.findall(text)), grid_size)
+
+
+def parse_sparse_coordinate(text, grid_size):
+    return keyed_grid(((int(r), int(c), v) for r, c, v in SPARSE_ENTRY.findall(text)), grid_size)
+
+
+def parse_markdown_table(text, grid_size):
+    rows = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line.startswith("|"):
+            continue
+        cells = [cell.strip() for cell in line.strip("|").split("|")]
+        if len(cells) == grid_size + 1 and cells[0].isalpha():
+            cells = cells[1:]  # Row label
+        if len(cells) == grid_size and all(CELL_TOKEN.match(cell) for cell in cells):
+            rows.append(cells)
+    return last_rows(rows, grid_size)
+
+
+def parse_alphanumeric_keyed(text, grid_size):
+    entries = ((ord(row.upper()) - ord("A") + 1, int(col), value) for row, col, value in KEYED_ENTRY.findall(text))
+    return keyed_grid(entries, grid_size)
+
+
+def parse_xml(text, grid_size):
+    rows = {}
+    for index, content in XML_ROW.findall(text):
+        cells = [cell.strip() for cell in content.split(",")]
+        if len(cells) == grid_size:
+            rows[int(index)] = cells
+    if sorted(rows)[-grid_size:] != list(range(1, grid_size + 1)):
+        raise ValueError(f"Expected <row> elements with index 1 to {grid_size}.")
+    return last_rows([rows[i] for i in range(1, grid_size + 1)], grid_size)
+
+
+# Parser per format_choice, the inverse of SudokuFormatConverter.get_format_methods
+PARSERS = {
+    1: parse_inline_string,
+    2: parse_row_by_row,
+    3: parse_key_value_row,
+    4: parse_grid_with_separators,
+    5: parse_csv,
+    6: parse_coordinate_list,
+    7: parse_grid_with_separators,
+    8: parse_sparse_coordinate,
+    9: parse_markdown_table,
+    10: parse_alphanumeric_keyed,
+    11: parse_xml,
+}
+
+
+def get_format_choice(description):
+    """Format number of a format description such as "CSV Format"."""
+    for number, name in SudokuConfig.get_conversion_formats().items():
+        if name == description:
+            return number
+    raise ValueError(f"Unknown format '{description}'.")
+
+
+def parse_answer(text, format_choice, grid_size):
+    """
+    Parse a grid in the given format (a number 1-11) out of a model answer. Fenced code
+    blocks are tried first, last block first, then the whole text. Returns a
+    grid_size x grid_size list of ints with 0 for empty or unreadable cells; raises
+    ValueError when no grid is found. Converted puzzles parse back to their grids in
+    every format.
+    """
+    parser = PARSERS[format_choice]
+    error = None
+    for candidate in reversed([text] + FENCED_BLOCK.findall(text)):
+        try:
+            return parser(candidate, grid_size)
+        except ValueError as e:
+            error = e
+    raise error
+
+
+def check_answer(grid, givens):
+    """
+    Check an answer grid against the puzzle it answers. Returns a dict of flags:
+    complete (every cell holds a number 1..n), matches_givens (the givens are kept),
+    valid (complete and no repeats in any row, column or sub-grid) and correct (valid
+    and matching the givens, so a solution of the puzzle).
+    """
+    n = len(givens)
+    values = [cell for row in grid for cell in row]
+    complete = len(grid) == n and len(values) == n * n and all(type(v) is int and 1 <= v <= n for v in values)
+    matches_givens = len(values) == n * n and all(
+        type(given) is not int or not 1 <= given <= n or values[r * n + c] == given
+        for r, row in enumerate(givens) for c, given in enumerate(row)
+    )
+    valid = complete and all(
+        len({values[i] for i in unit}) == n for unit in SudokuConfig.get_geometry(n).units
+    )
+    return {
+        "complete": complete,
+        "matches_givens": matches_givens,
+        "valid": valid,
+        "correct": valid and matches_givens,
+    }
+
+
+def require_numpy(caller):
+    # Import NumPy on the first batch call, so parse_answer users start without it
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            raise ImportError(f"{caller} requires NumPy; install it with 'pip install numpy'.")
+        np = numpy
+
+
+@functools.lru_cache(maxsize=None)
+def get_layout(format_choice, grid_size):
+    """
+    Exact layout of a complete grid in a format when every cell is one unquoted
+    character: (text bytes, skeleton mask, cell positions in row-major order, quote
+    characters). Answers with this layout are parsed with array operations only.
+    """
+    marker = [[LAYOUT_MARKER] * grid_size for _ in range(grid_size)]
+    text = unquote_cells(get_formatter(grid_size, symbols=True).renderers[format_choice](marker))
+    data = np.frombuffer(text.encode("ascii"), dtype=np.uint8)
+    is_cell = data == ord(LAYOUT_MARKER)
+    return data, ~is_cell, np.flatnonzero(is_cell), text.count('"') + text.count("'")
+
+
+@functools.lru_cache(maxsize=None)
+def get_cell_table(grid_size):
+    # Number of every byte as a one-character cell, as parse_cell reads it; -1 for bytes
+    # that are no cell token, which sends the answer to parse_answer
+    table = np.full(256, -1, dtype=np.int16)
+    for digit in range(10):
+        table[ord(str(digit))] = digit
+    for letter in range(26):
+        table[ord("A") + letter] = table[ord("a") + letter] = letter + 10 if grid_size > 9 else 0
+    for placeholder in "._*?":
+        table[ord(placeholder)] = 0
+    return table
+
+
+def unquote_cells(text):
+    # Drop the quotes around one-character cells, so "A", 'A' and A read alike
+    if "'" in text or '"' in text:
+        return QUOTED_CELL.sub(r"\2", text)
+    return text
+
+
+def answer_body(text, quotes):
+    # The part of an answer the fast path reads: the last fenced block if any, with cells
+    # unquoted unless the text has no more quotes than the layout (the common case)
+    fences = text.count("```")
+    if fences == 2:
+        # One block, found without the regex: the same text FENCED_BLOCK would match
+        start = text.find("```")
+        line_end = text.find("\n", start + 3)
+        end = text.find("```", start + 3)
+        if line_end != -1 and line_end < end:
+            text = text[line_end + 1:end]
+    elif fences:
+        blocks = FENCED_BLOCK.findall(text)
+        if blocks:
+            text = blocks[-1]
+    text = text.strip()
+    if text.count('"') + text.count("'") != quotes:
+        text = unquote_cells(text)
+    return text.encode("utf-8")
+
+
+def parse_batch(texts, format_choice, grid_size):
+    """
+    Parse many answers in one format at once. Returns (grids, parsed): a uint8 array
+    of shape (N, grid_size, grid_size) with 0 for empty or unreadable cells, and a
+    bool array telling which answers held a grid.
+
+    Answers laid out exactly as the converter writes a complete grid (quotes around
+    cells, an enclosing code block and surrounding whitespace aside) are decoded in
+    blocks with array operations. Every other answer goes through parse_answer, so the
+    results are the same as parsing each answer on its own.
+    """
+    require_numpy("parse_batch")
+    template, skeleton, cell_positions, quotes = get_layout(format_choice, grid_size)
+    length = len(template)
+    table = get_cell_table(grid_size)
+    texts = list(texts)
+    grids = np.zeros((len(texts), grid_size * grid_size), dtype=np.uint8)
+    parsed = np.zeros(len(texts), dtype=bool)
+
+    for start in range(0, len(texts), BLOCK_SIZE):
+        bodies = [answer_body(text, quotes) for text in texts[start:start + BLOCK_SIZE]]
+        fitting = np.fromiter(map(len, bodies), dtype=np.int64, count=len(bodies)) == length
+        if fitting.any():
+            data = np.frombuffer(b"".join(itertools.compress(bodies, fitting)), dtype=np.uint8)
+            data = data.reshape(-1, length)
+            cells = table[data[:, cell_positions]]
+            exact = ~((data != template) & skeleton).any(axis=1) & (cells >= 0).all(axis=1)
+            rows = start + np.flatnonzero(fitting)[exact]
+            grids[rows] = cells[exact]
+            parsed[rows] = True
+        for index in start + np.flatnonzero(~parsed[start:start + len(bodies)]):
+            try:
+                grids[index] = np.clip(parse_answer(texts[index], format_choice, grid_size), 0, 255).ravel()
+                parsed[index] = True
+            except ValueError:
+                pass
+    return grids.reshape(-1, grid_size, grid_size), parsed
+
+
+def puzzles_to_array(puzzles):
+    """(N, n, n) uint8 array of puzzle grids, with 0 for placeholders and other non-digit cells."""
+    require_numpy("puzzles_to_array")
+    return np.array(
+        [[[cell if type(cell) is int and cell > 0 else 0 for cell in row] for row in puzzle] for puzzle in puzzles],
+        dtype=np.uint8,
+    )
+
+
+def validate_batch(grids, givens=None):
+    """
+    Vectorized check_answer over an (N, n, n) batch of answer grids, with the puzzles'
+    givens as an (N, n, n) array (0 for empty cells; see puzzles_to_array). Returns a
+    dict of bool arrays: complete, matches_givens, valid and correct.
+
+    Every number d becomes bit d - 1; a complete unit is valid when the OR of its bits
+    has all n bits set, which takes one reduction per row, column and sub-grid.
+    """
+    require_numpy("validate_batch")
+    grids = np.asarray(grids)
+    if grids.dtype != np.uint8:
+        grids = np.clip(grids, 0, 255).astype(np.uint8)  # Out-of-range numbers stay out of range
+    count, n = grids.shape[0], grids.shape[1]
+    geometry = SudokuConfig.get_geometry(n)
+    full = (1 << n) - 1
+    bit_table = np.zeros(256, dtype=np.uint32)  # Bit of every number 1..n, 0 for anything else
+    bit_table[1:n + 1] = np.left_shift(1, np.arange(n, dtype=np.uint32))
+    results = {name: np.zeros(count, dtype=bool) for name in ("complete", "matches_givens", "valid", "correct")}
+
+    for start in range(0, count, BLOCK_SIZE):
+        block = grids[start:start + BLOCK_SIZE]
+        bits = bit_table[block]
+        complete = (bits != 0).all(axis=(1, 2))
+        boxes = bits.reshape(-1, geometry.num_bands, geometry.box_rows, geometry.num_stacks, geometry.box_cols)
+        valid = (
+            complete
+            & (np.bitwise_or.reduce(bits, axis=2) == full).all(axis=1)
+            & (np.bitwise_or.reduce(bits, axis=1) == full).all(axis=1)
+            & (np.bitwise_or.reduce(boxes, axis=(2, 4)) == full).all(axis=(1, 2))
+        )
+        if givens is None:
+            matches = np.ones(len(block), dtype=bool)
+        else:
+            given = np.asarray(givens[start:start + BLOCK_SIZE])
+            matches = ((given == 0) | (block == given)).all(axis=(1, 2))
+        end = start + len(block)
+        results["complete"][start:end] = complete
+        results["matches_givens"][start:end] = matches
+        results["valid"][start:end] = valid
+        results["correct"][start:end] = valid & matches
+    return results
+
+
+def grade_batch(texts, format_choice, puzzles):
+    """
+    Parse and validate answers to puzzles of one grid size, all in one format. Returns
+    the validate_batch dict with a "parsed" array added; answers that held no grid
+    count as incomplete.
+    """
+    require_numpy("grade_batch")
+    givens = puzzles if isinstance(puzzles, np.ndarray) else puzzles_to_array(puzzles)
+    grids, parsed = parse_batch(texts, format_choice, givens.shape[1])
+    results = validate_batch(grids, givens)
+    results["parsed"] = parsed
+    return results
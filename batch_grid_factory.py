@@ -0,0 +1,157 @@
+# Sudoku4LLM/batch_grid_factory.py
+
+import argparse
+import itertools
+import math
+import random
+import time
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is only needed for batch grid generation
+    np = None
+
+from geometry import get_geometry  # Band and stack layout
+from sudoku_solver import SudokuSolver  # Builds the seed solutions
+
+MAX_TABLE_PERMUTATION = 9  # Largest size whose permutations are tabulated (9! rows)
+BLOCK_SIZE = 65536  # Grids transformed per vectorized block
+
+
+class BatchGridFactory:
+    """
+    Batch generator of complete grids built from a few seed solutions.
+
+    Every output grid is a seed solution with a random validity-preserving transform
+    applied: digit relabeling, row permutations within bands, band permutations,
+    column permutations within stacks, stack permutations and (for square sub-grids)
+    transposition. sub_grid_size is an int for square sub-grids or a (rows, columns)
+    pair. All transforms of a batch are applied together as NumPy index operations
+    over an (N, n, n) array, so no backtracking happens per grid.
+    """
+
+    def __init__(self, grid_size, sub_grid_size, num_seed_grids=8, seed=None):
+        if np is None:
+            raise ImportError("BatchGridFactory requires NumPy; install it with 'pip install numpy'.")
+        self.grid_size = grid_size
+        self.sub_grid_size = sub_grid_size
+        self.geometry = get_geometry(grid_size, sub_grid_size)
+        self.np_rng = np.random.default_rng(seed)
+        self.permutation_tables = {}  # size -> array of all permutations of range(size)
+
+        # Seed solutions come from the randomized solver, seeded from the factory's generator
+        solver = SudokuSolver(grid_size, sub_grid_size)
+        seed_rng = random.Random(int(self.np_rng.integers(2 ** 63)))
+        self.seed_grids = np.array(
+            [solver.fill_random(seed_rng) for _ in range(num_seed_grids)], dtype=np.uint8
+        )
+
+        # Flattened seed solutions to draw from. With square sub-grids their transposes
+        # are included, which makes transposition part of the random transform.
+        sources = [self.seed_grids]
+        if self.geometry.is_square:
+            sources.append(self.seed_grids.transpose(0, 2, 1))
+        self.source_grids = np.concatenate(sources).reshape(-1, grid_size * grid_size)
+
+    def random_permutations(self, count, size):
+        # One independent random permutation of range(size) per row. Small sizes draw
+        # rows from a table of all permutations, which is much cheaper than sorting.
+        if size <= MAX_TABLE_PERMUTATION:
+            if size not in self.permutation_tables:
+                self.permutation_tables[size] = np.array(list(itertools.permutations(range(size))), dtype=np.intp)
+            table = self.permutation_tables[size]
+            return table[self.np_rng.integers(len(table), size=count)]
+        return np.argsort(self.np_rng.random((count, size)), axis=1)
+
+    def random_line_order(self, count, num_groups, group_size):
+        # Row (or column) order that permutes bands (stacks) and the lines within each
+        group_order = self.random_permutations(count, num_groups)
+        within = self.random_permutations(count * num_groups, group_size).reshape(count, num_groups, group_size)
+        return (group_order[:, :, None] * group_size + within).reshape(count, self.grid_size)
+
+    def generate(self, count):
+        """Return `count` complete grids as a (count, n, n) uint8 array."""
+        n = self.grid_size
+        grids = np.empty((count, n * n), dtype=np.uint8)
+        # Work in blocks so the index arrays stay small and cache-friendly
+        for start in range(0, count, BLOCK_SIZE):
+            stop = min(start + BLOCK_SIZE, count)
+            grids[start:stop] = self.generate_block(stop - start)
+        return grids.reshape(count, n, n)
+
+    def generate_block(self, count):
+        # Transform `count` randomly chosen seed solutions; returns a (count, n * n) array
+        n = self.grid_size
+        seeds = self.source_grids[self.np_rng.integers(len(self.source_grids), size=count)]
+
+        # Compose row and column orders into one source index per output cell,
+        # so the whole geometric transform is a single gather
+        geometry = self.geometry
+        rows = self.random_line_order(count, geometry.num_bands, geometry.box_rows).astype(np.int16) * n
+        cols = self.random_line_order(count, geometry.num_stacks, geometry.box_cols).astype(np.int16)
+        source = (rows[:, :, None] + cols[:, None, :]).reshape(count, n * n)
+        grids = np.take_along_axis(seeds, source, axis=1)
+
+        # Digit relabeling: labels[k, d] is the new digit for digit d of grid k,
+        # looked up in the flattened label table with one gather
+        labels = np.zeros((count, n + 1), dtype=np.uint8)
+        labels[:, 1:] = self.random_permutations(count, n) + 1
+        offsets = (np.arange(count, dtype=np.int32) * (n + 1))[:, None]
+        return labels.ravel()[grids + offsets]
+
+    def orbit_size_bound(self):
+        """Upper bound on the number of distinct grids reachable from one seed solution."""
+        geometry = self.geometry
+        row_orders = math.factorial(geometry.num_bands) * math.factorial(geometry.box_rows) ** geometry.num_bands
+        col_orders = math.factorial(geometry.num_stacks) * math.factorial(geometry.box_cols) ** geometry.num_stacks
+        transposes = 2 if geometry.is_square else 1
+        return math.factorial(self.grid_size) * row_orders * col_orders * transposes
+
+    def diversity_report(self, grids):
+        """
+        Summarize how diverse a batch is: distinct grids, their share of the batch,
+        the number of seed solutions and the bound on grids reachable from them.
+        """
+        count = len(grids)
+        distinct = len({grid.tobytes() for grid in np.ascontiguousarray(grids)})
+        return {
+            "count": count,
+            "distinct": distinct,
+            "distinct_ratio": distinct / count if count else 0.0,
+            "seed_grids": len(self.seed_grids),
+            "reachable_bound": len(self.seed_grids) * self.orbit_size_bound(),
+        }
+
+
+def main(argv=None):
+    from config import SudokuConfig  # Only needed for the command line
+
+    parser = argparse.ArgumentParser(description="Generate complete grids in batches and report their diversity.")
+    parser.add_argument("--grid", default="9x9", help="Grid size, e.g. 4x4, 6x6 or 12x12 (default: 9x9).")
+    parser.add_argument("-n", "--count", type=int, default=1000000, help="Number of grids (default: 1000000).")
+    parser.add_argument("--seed-grids", type=int, default=8, help="Number of seed solutions (default: 8).")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for reproducible batches.")
+    parser.add_argument("--output", default=None, help="Optional .npy file to save the grids to.")
+    args = parser.parse_args(argv)
+
+    configs = SudokuConfig.get_configs()
+    if args.grid not in configs:
+        print(f"Error: Invalid grid size '{args.grid}'; choose from {', '.join(configs)}.")
+        exit(1)
+    config = configs[args.grid]
+
+    factory = BatchGridFactory(config["grid_size"], config["sub_grid_size"], args.seed_grids, args.seed)
+    start = time.perf_counter()
+    grids = factory.generate(args.count)
+    elapsed = time.perf_counter() - start
+    print(f"Generated {args.count} grids in {elapsed:.3f}s ({args.count / elapsed:,.0f} grids/s).")
+    for key, value in factory.diversity_report(grids).items():
+        print(f"- {key}: {value}")
+
+    if args.output:
+        np.save(args.output, grids)
+        print(f"Grids saved to {args.output}.")
+
+
+if __name__ == "__main__":
+    main()
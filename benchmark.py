@@ -0,0 +1,265 @@
+# Sudoku4LLM/benchmark.py
+
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import sys
+import time
+
+from config import SudokuConfig  # Grid configurations and conversion formats
+from format_convertor import SudokuFormatConverter, resolve_formats  # Format methods
+from sudoku_generator import (  # Generator and its settings handling
+    DEFAULT_GENERATION_OPTIONS, SudokuGenerator, as_list, derive_puzzle_seed, resolve_settings,
+)
+
+BENCHMARK_SEED = 1234  # Master seed of every benchmark run, so runs measure the same puzzles
+STAGES = ("fill", "generate", "unique", "convert")
+# Puzzles per case by grid size: large grids take seconds per puzzle
+DEFAULT_CASE_SIZES = {4: 200, 6: 200, 8: 100, 9: 100, 12: 30, 16: 5, 25: 2}
+DEFAULT_REPEAT = 3  # Timings per puzzle; the fastest one counts
+REGRESSION_THRESHOLD = 0.20  # Relative throughput drop (or p99 rise) reported as a regression
+
+
+def get_peak_rss_mb():
+    # Peak resident set size of this process in MiB, or None where it cannot be read. It covers
+    # the whole run so far, not a single case, so it is reported once per run
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def percentile(sorted_values, fraction):
+    # Nearest-rank percentile of an ascending list
+    rank = max(1, math.ceil(len(sorted_values) * fraction))
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies):
+    """Throughput and latency statistics of per-puzzle latencies in seconds."""
+    total = sum(latencies)
+    ordered = sorted(latencies)
+    return {
+        "count": len(latencies),
+        "seconds": round(total, 6),
+        "puzzles_per_sec": round(len(latencies) / total, 2) if total else None,
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 4),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 4),
+    }
+
+
+def time_calls(function, items, repeat=DEFAULT_REPEAT):
+    """
+    Call function on every item `repeat` times. Returns (latencies, outputs): the fastest
+    latency per item in seconds, which filters out noise from the rest of the machine,
+    and the function's outputs. function must give the same result every time.
+    """
+    latencies = []
+    outputs = []
+    clock = time.perf_counter
+    for item in items:
+        fastest = None
+        for _ in range(repeat):
+            start = clock()
+            output = function(item)
+            elapsed = clock() - start
+            if fastest is None or elapsed < fastest:
+                fastest = elapsed
+        latencies.append(fastest)
+        outputs.append(output)
+    return latencies, outputs
+
+
+def benchmark_settings(config, settings, count, seed, stages, repeat=DEFAULT_REPEAT):
+    """
+    Benchmark one grid x difficulty x uniqueness case. Returns ({stage: statistics}, puzzles);
+    the puzzles are reused by the convert stage.
+    """
+    percent_missing, enforce_unique, placeholder = settings
+    generator = SudokuGenerator(config["grid_size"], config["sub_grid_size"], placeholder, enforce_unique)
+    results = {}
+
+    if "fill" in stages:
+        def fill(index):
+            generator.rng = random.Random(derive_puzzle_seed(seed, index))
+            return generator.fill_grid()
+
+        results["fill"] = summarize(time_calls(fill, range(count), repeat)[0])
+
+    # Puzzles are always generated: the unique and convert stages need them
+    def generate(index):
+        return generator.generate_puzzle(
+            percent_missing, seed=derive_puzzle_seed(seed, index),
+            max_attempts=DEFAULT_GENERATION_OPTIONS["max_attempts"]
+        )
+
+    latencies, puzzles = time_calls(generate, range(count), repeat if "generate" in stages else 1)
+    if "generate" in stages:
+        results["generate"] = summarize(latencies)
+
+    if "unique" in stages:
+        results["unique"] = summarize(time_calls(generator.has_unique_solution, puzzles, repeat)[0])
+    return results, puzzles
+
+
+def benchmark_formats(puzzles, format_choices, repeat=DEFAULT_REPEAT):
+    """Benchmark every format on the puzzles of one grid size. Returns {format name: statistics}."""
+    converter = SudokuFormatConverter(None, None)
+    format_methods = converter.get_format_methods()
+    results = {}
+    for format_choice in format_choices:
+        description, format_function = format_methods[format_choice]
+        latencies = time_calls(format_function, puzzles, repeat)[0]
+        results[description.replace(" ", "_").lower()] = summarize(latencies)
+    return results
+
+
+def run_benchmarks(grids="all", difficulty="all", unique="all", formats="all", stages=STAGES, n=None,
+                   seed=BENCHMARK_SEED, repeat=DEFAULT_REPEAT, progress=print):
+    """
+    Run the benchmark over the grid x difficulty x uniqueness matrix (and every format on the
+    puzzles of each grid) and return {case name: statistics}. Case names look like
+    "generate/9x9/diff-60/unique" and "convert/9x9/csv_format". n is the number of puzzles per
+    case (default: DEFAULT_CASE_SIZES by grid size); every puzzle is timed `repeat` times.
+    """
+    configs = SudokuConfig.get_configs()
+    format_choices = resolve_formats(formats)
+    for stage in stages:
+        if stage not in STAGES:
+            raise ValueError(f"Invalid stage '{stage}'; choose from {', '.join(STAGES)}.")
+
+    results = {}
+    for grid_choice in (list(configs) if "all" in as_list(grids) else as_list(grids)):
+        key = f"{grid_choice}x{grid_choice}" if isinstance(grid_choice, int) else grid_choice
+        if key not in configs:
+            raise ValueError(f"Invalid grid size '{grid_choice}'; choose from {', '.join(configs)}.")
+        config = configs[key]
+        count = n if n is not None else DEFAULT_CASE_SIZES.get(config["grid_size"], 10)
+        grid_puzzles = []
+        for settings in resolve_settings(config, difficulty, unique, None):
+            percent_missing, enforce_unique, _ = settings
+            case = f"{key}/diff-{percent_missing}/{'unique' if enforce_unique else 'non_unique'}"
+            stage_results, puzzles = benchmark_settings(config, settings, count, seed, stages, repeat)
+            grid_puzzles.extend(puzzles)
+            for stage, statistics in stage_results.items():
+                results[f"{stage}/{case}"] = statistics
+                progress(format_result(f"{stage}/{case}", statistics))
+        if "convert" in stages:
+            for name, statistics in benchmark_formats(grid_puzzles, format_choices, repeat).items():
+                results[f"convert/{key}/{name}"] = statistics
+                progress(format_result(f"convert/{key}/{name}", statistics))
+    return results
+
+
+def format_result(name, statistics):
+    # One line of the benchmark report
+    return (f"{name:<48} {statistics['puzzles_per_sec'] or 0:>12.1f}/s "
+            f"p50 {statistics['p50_ms']:>10.3f} ms  p99 {statistics['p99_ms']:>10.3f} ms")
+
+
+def compare_results(results, baseline, threshold=REGRESSION_THRESHOLD):
+    """
+    Compare results with baseline results (same shape). Returns a list of
+    (case name, message) for every case whose throughput dropped, or whose p99 latency
+    rose, by more than threshold.
+    """
+    regressions = []
+    for name, statistics in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        if before["puzzles_per_sec"] and statistics["puzzles_per_sec"] is not None:
+            change = statistics["puzzles_per_sec"] / before["puzzles_per_sec"] - 1
+            if change < -threshold:
+                regressions.append((name, f"throughput {before['puzzles_per_sec']} -> "
+                                          f"{statistics['puzzles_per_sec']}/s ({change:+.0%})"))
+        if before["p99_ms"]:
+            change = statistics["p99_ms"] / before["p99_ms"] - 1
+            if change > threshold:
+                regressions.append((name, f"p99 {before['p99_ms']} -> {statistics['p99_ms']} ms ({change:+.0%})"))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark puzzle generation, uniqueness checks and format conversion with fixed seeds."
+    )
+    parser.add_argument("--grid", nargs="+", default=["all"], help="Grid sizes, e.g. 4x4 9x9 (default: all).")
+    parser.add_argument("--difficulty", nargs="+", default=["all"],
+                        help="Difficulty levels or percentages (default: all).")
+    parser.add_argument("--unique", nargs="+", default=["all"], choices=["unique", "non_unique", "all"],
+                        help="Solution uniqueness options (default: all).")
+    parser.add_argument("--formats", nargs="+", default=["all"], help="Formats to convert to (default: all).")
+    parser.add_argument("--stages", nargs="+", default=list(STAGES), choices=STAGES,
+                        help="Stages to measure (default: all).")
+    parser.add_argument("-n", "--num-puzzles", type=int, default=None,
+                        help="Puzzles per case (default: depends on the grid size).")
+    parser.add_argument("--seed", type=int, default=BENCHMARK_SEED,
+                        help="Master seed (default: %(default)s); keep it fixed to compare runs.")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT,
+                        help="Timings per puzzle, of which the fastest counts (default: %(default)s).")
+    parser.add_argument("--output", default="benchmark_results.json",
+                        help="JSON file for the results (default: %(default)s).")
+    parser.add_argument("--baseline", default=None,
+                        help="Results JSON of an earlier run; regressions against it make the run fail.")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="Relative change reported as a regression (default: %(default)s).")
+    args = parser.parse_args(argv)
+    if args.num_puzzles is not None and args.num_puzzles < 1:
+        parser.error("--num-puzzles must be at least 1.")
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1.")
+    difficulty = [int(level) if level.isdigit() else level for level in args.difficulty]
+
+    baseline = None
+    if args.baseline is not None:
+        try:
+            with open(args.baseline, "r") as file:
+                baseline = json.load(file)
+        except (OSError, json.JSONDecodeError):
+            print(f"Error: Baseline file '{args.baseline}' is not a benchmark results file.")
+            exit(1)
+        if baseline.get("seed") != args.seed:
+            print(f"Warning: the baseline was run with seed {baseline.get('seed')}, not {args.seed}.")
+
+    try:
+        results = run_benchmarks(args.grid, difficulty, args.unique, args.formats, args.stages,
+                                 args.num_puzzles, args.seed, args.repeat)
+    except ValueError as e:
+        print(f"Error: {e}")
+        exit(1)
+    peak_rss_mb = get_peak_rss_mb()
+    print(f"Peak RSS of the run: {peak_rss_mb} MiB")
+
+    directory = os.path.dirname(args.output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(args.output, "w") as file:
+        json.dump({
+            "seed": args.seed,
+            "repeat": args.repeat,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "peak_rss_mb": peak_rss_mb,
+            "results": results,
+        }, file, indent=2)
+    print(f"Benchmark results saved to {args.output}.")
+
+    if baseline is not None:
+        regressions = compare_results(results, baseline.get("results", {}), args.threshold)
+        for name, message in regressions:
+            print(f"REGRESSION {name}: {message}")
+        if regressions:
+            exit(1)
+        print(f"No regressions against {args.baseline}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,33 @@
 # Sudoku4LLM/config.py
 
+import functools
+import types
+
+from geometry import get_box_shape, get_geometry  # Sub-grid shapes and shared index tables
+
+
+def freeze(value):
+    """Read-only copy of nested dicts and lists: dicts become MappingProxyType views, lists tuples."""
+    if isinstance(value, dict):
+        return types.MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
 class SudokuConfig:
     @staticmethod
+    @functools.lru_cache(maxsize=None)
     def get_configs():
-        # Define configurations for different Sudoku versions
+        """
+        Configurations of the Sudoku versions. Built and frozen once per process, so every
+        caller (and every forked worker) shares the same read-only mapping; copy a
+        configuration with dict(config) to change it.
+        """
         configs = {
             "4x4": {
                 "grid_size": 4,
-                "sub_grid_size": 2,
+                "sub_grid_size": 2,  # Square sub-grids: an int; rectangular ones: (rows, columns)
                 "num_puzzles": 100,
                 "base_output_path": "./sudoku_data/4x4/jsonl",  # JSONL files path
                 "converted_output_path": "./sudoku_data/4x4/converted",  # Converted formats path
@@ -34,7 +54,7 @@ class SudokuConfig:
             },
             "6x6": {
                 "grid_size": 6,
-                "sub_grid_size": 2,
+                "sub_grid_size": (2, 3),  # Sub-grids of 2 rows x 3 columns
                 "num_puzzles": 100,
                 "base_output_path": "./sudoku_data/6x6/jsonl",
                 "converted_output_path": "./sudoku_data/6x6/converted",
@@ -60,6 +80,34 @@ class SudokuConfig:
                 - Some cells are pre-filled, and the player must fill in the rest.
                 """
             },
+            "8x8": {
+                "grid_size": 8,
+                "sub_grid_size": (2, 4),  # Sub-grids of 2 rows x 4 columns
+                "num_puzzles": 100,
+                "base_output_path": "./sudoku_data/8x8/jsonl",
+                "converted_output_path": "./sudoku_data/8x8/converted",
+                "difficulty_levels": {
+                    "beginner": 25,
+                    "easy": 35,
+                    "medium": 45,
+                    "hard": 55,
+                },
+                "enforce_unique_options": {
+                    "unique": True,
+                    "non_unique": False,
+                },
+                "default_options": {
+                    "difficulty": "medium",  # Default difficulty
+                    "enforce_unique": "unique",  # Default enforce unique setting
+                    "placeholder": ".",  # Default placeholder
+                },
+                "rules": """
+                8x8 Sudoku Rules:
+                - The grid is 8x8 in size.
+                - Each row, column, and 2x4 sub-grid must contain the numbers 1 to 8 exactly once.
+                - Some cells are pre-filled, and the player must fill in the rest.
+                """
+            },
             "9x9": {
                 "grid_size": 9,
                 "sub_grid_size": 3,
@@ -89,23 +137,148 @@ class SudokuConfig:
                 - Some cells are pre-filled, and the player must fill in the rest.
                 """
             },
+            "12x12": {
+                "grid_size": 12,
+                "sub_grid_size": (3, 4),  # Sub-grids of 3 rows x 4 columns
+                "num_puzzles": 100,
+                "base_output_path": "./sudoku_data/12x12/jsonl",
+                "converted_output_path": "./sudoku_data/12x12/converted",
+                "difficulty_levels": {
+                    "beginner": 30,
+                    "easy": 40,
+                    "medium": 50,
+                    "hard": 60,
+                },
+                "enforce_unique_options": {
+                    "unique": True,
+                    "non_unique": False,
+                },
+                "default_options": {
+                    "difficulty": "medium",  # Default difficulty
+                    "enforce_unique": "non_unique",  # Default enforce unique setting
+                    "placeholder": ".",  # Default placeholder
+                },
+                "rules": """
+                12x12 Sudoku Rules:
+                - The grid is 12x12 in size.
+                - Each row, column, and 3x4 sub-grid must contain the symbols 1 to 9 and A to C exactly once.
+                - The letters stand for the numbers 10 to 12 (A = 10, B = 11, C = 12).
+                - Some cells are pre-filled, and the player must fill in the rest.
+                """
+            },
+            "16x16": {
+                "grid_size": 16,
+                "sub_grid_size": 4,
+                "num_puzzles": 100,
+                "base_output_path": "./sudoku_data/16x16/jsonl",
+                "converted_output_path": "./sudoku_data/16x16/converted",
+                "difficulty_levels": {
+                    "beginner": 30,
+                    "easy": 40,
+                    "medium": 50,
+                    "hard": 60,
+                },
+                "enforce_unique_options": {
+                    "unique": True,
+                    "non_unique": False,
+                },
+                "default_options": {
+                    "difficulty": "medium",  # Default difficulty
+                    "enforce_unique": "non_unique",  # Default enforce unique setting
+                    "placeholder": ".",  # Default placeholder
+                },
+                "rules": """
+                16x16 Sudoku Rules:
+                - The grid is 16x16 in size.
+                - Each row, column, and 4x4 sub-grid must contain the symbols 1 to 9 and A to G exactly once.
+                - The letters stand for the numbers 10 to 16 (A = 10, B = 11, ..., G = 16).
+                - Some cells are pre-filled, and the player must fill in the rest.
+                """
+            },
+            "25x25": {
+                "grid_size": 25,
+                "sub_grid_size": 5,
+                "num_puzzles": 100,
+                "base_output_path": "./sudoku_data/25x25/jsonl",
+                "converted_output_path": "./sudoku_data/25x25/converted",
+                "difficulty_levels": {
+                    "beginner": 20,
+                    "easy": 30,
+                    "medium": 40,
+                    "hard": 50,
+                },
+                "enforce_unique_options": {
+                    "unique": True,
+                    "non_unique": False,
+                },
+                "default_options": {
+                    "difficulty": "medium",  # Default difficulty
+                    "enforce_unique": "non_unique",  # Default enforce unique setting
+                    "placeholder": ".",  # Default placeholder
+                },
+                "rules": """
+                25x25 Sudoku Rules:
+                - The grid is 25x25 in size.
+                - Each row, column, and 5x5 sub-grid must contain the symbols 1 to 9 and A to P exactly once.
+                - The letters stand for the numbers 10 to 25 (A = 10, B = 11, ..., P = 25).
+                - Some cells are pre-filled, and the player must fill in the rest.
+                """
+            },
         }
-        return configs
+        return freeze(configs)
+
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def get_rule_registry():
+        """
+        Precomputed rule registry keyed by grid size. Built and frozen once per process, like
+        the configurations; each entry holds a short rule_id that converted records can use
+        instead of the full text.
+        """
+        registry = {}
+        for version, config in SudokuConfig.get_configs().items():
+            registry[config["grid_size"]] = {
+                "rule_id": f"sudoku_{version}",
+                "rules": config["rules"].strip(),
+            }
+        return freeze(registry)
+
+    @staticmethod
+    def get_rule(grid_size):
+        # Stripped rule text for a grid size
+        entry = SudokuConfig.get_rule_registry().get(grid_size)
+        return entry["rules"] if entry else "Unknown rules"
 
     @staticmethod
+    def get_rule_id(grid_size):
+        # Rule ID for a grid size, or None if there are no rules for it
+        entry = SudokuConfig.get_rule_registry().get(grid_size)
+        return entry["rule_id"] if entry else None
+
+    @staticmethod
+    def get_digit_symbol(value):
+        # Display symbol of a cell: 1-9 stay numbers, 10 and up become letters (A = 10, B = 11, ...).
+        # Placeholders and other non-digit cells are returned unchanged.
+        if type(value) is int and value > 9:
+            return chr(ord("A") + value - 10)
+        return value
+
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
     def get_placeholder_options():
-        # Define all available placeholder options for missing numbers
-        return {
+        # Define all available placeholder options for missing numbers (frozen, built once)
+        return freeze({
             "0": "0 (Machine-readable formats)",
             ".": ". (Human-readable text-based grids)",
             "_": "_ (Visual emphasis in puzzles)",
             "*": "* (Visually striking representations)",
             "?": "? (Expressing uncertainty/unknowns)",
-        }
+        })
 
     @staticmethod
+    @functools.lru_cache(maxsize=None)
     def get_conversion_formats():
-        # Define the 11 Sudoku puzzle formats for conversion
+        # Define the 11 Sudoku puzzle formats for conversion (frozen, built once)
         formats = {
             1: "Inline String Format",
             2: "Row-by-Row List Format",
@@ -119,21 +292,41 @@ class SudokuConfig:
             10: "Alphanumeric Keyed Format",
             11: "XML Format",
         }
-        return formats
+        return freeze(formats)
 
     @staticmethod
     def validate_config(config):
         # Validate individual configuration entries
-        if config["grid_size"] % config["sub_grid_size"] != 0:
+        box_rows, box_cols = get_box_shape(config["grid_size"], config["sub_grid_size"])
+        if config["grid_size"] <= 0 or box_rows <= 0 or box_cols <= 0:
             raise ValueError(
-                f"Invalid configuration: grid_size {config['grid_size']} "
-                f"must be divisible by sub_grid_size {config['sub_grid_size']}."
+                f"Invalid configuration: grid_size and sub_grid_size must be positive integers."
             )
-        if config["grid_size"] <= 0 or config["sub_grid_size"] <= 0:
+        if box_rows * box_cols != config["grid_size"]:
             raise ValueError(
-                f"Invalid configuration: grid_size and sub_grid_size must be positive integers."
+                f"Invalid configuration: a {box_rows}x{box_cols} sub_grid_size does not tile "
+                f"a {config['grid_size']}x{config['grid_size']} grid."
             )
 
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def get_config_by_grid_size(grid_size):
+        # Configuration of a grid size, or None if there is none
+        for config in SudokuConfig.get_configs().values():
+            if config["grid_size"] == grid_size:
+                return config
+        return None
+
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def get_geometry(grid_size):
+        """
+        Shared SudokuGeometry of a grid size, using the configured sub-grid shape when
+        the grid size has a configuration and the most square shape otherwise.
+        """
+        config = SudokuConfig.get_config_by_grid_size(grid_size)
+        return get_geometry(grid_size, config["sub_grid_size"] if config else None)
+
     @staticmethod
     def validate_all_configs(configs):
         # Validate all configurations
@@ -149,13 +342,14 @@ class SudokuConfig:
         return """
         Sudoku Generator Instructions:
         ----------------------------------
-        1. Choose a version: 4x4, 6x6, or 9x9.
+        1. Choose a version: 4x4, 6x6, 8x8, 9x9, 12x12, 16x16, or 25x25.
         2. Choose a difficulty level:
            - Beginner: Few missing numbers
            - Easy: Moderate missing numbers
            - Medium: Balanced difficulty
            - Hard: Many missing numbers
            - Expert: Most numbers missing (9x9 only)
+           Grids from 12x12 up write 10 and above as letters (A = 10, B = 11, ...).
         3. Choose a placeholder for missing numbers:
            - Example: 0, ., _, *, or ?
         4. Decide whether puzzles must have unique solutions.
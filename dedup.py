@@ -0,0 +1,312 @@
+# Sudoku4LLM/dedup.py
+
+import argparse
+import functools
+import hashlib
+import itertools
+import json
+import math
+import os
+
+from config import SudokuConfig  # Sub-grid shape per grid size
+from geometry import get_geometry  # Band and stack layout
+from puzzle import Puzzle  # Compact grids
+from puzzle_io import JsonlPuzzleWriter  # Streaming JSONL writer
+
+DIGEST_SIZE = 8  # Bytes per canonical-form digest in the index
+MAX_CANONICAL_STATES = 200000  # Largest search frontier before falling back to relabeling only
+INDEX_FLUSH_EVERY = 4096  # Digests buffered before the index file is appended to
+
+
+class Canonicalizer:
+    """
+    Canonical form of puzzles under the Sudoku symmetry group.
+
+    Two puzzles are equivalent if one can be turned into the other by relabeling digits,
+    permuting rows within a band, permuting bands, permuting columns within a stack,
+    permuting stacks and (for square sub-grids) transposing. The canonical form is the
+    smallest equivalent grid read row by row, with empty cells as 0 and digits relabeled
+    in order of first appearance.
+
+    The minimum is found by branch and bound: rows are added one at a time, keeping only
+    the partial transforms whose prefix is still the smallest. Columns are tracked as
+    ordered cells of still-interchangeable columns, so columns that have only been empty
+    so far are not told apart until a later row does.
+
+    Rows with many digits seen for the first time can still make the frontier explode on
+    large grids with few empty cells. Beyond MAX_CANONICAL_STATES the form only accounts
+    for relabeling and transposition, so such puzzles are only matched with copies of
+    themselves up to those; the fallback is taken for every puzzle of an equivalence
+    class alike, so it never merges puzzles that are not equivalent.
+    """
+
+    def __init__(self, grid_size, sub_grid_size):
+        # sub_grid_size is an int for square sub-grids or a (rows, columns) pair
+        self.geometry = get_geometry(grid_size, sub_grid_size)
+        self.grid_size = grid_size
+        self.stacks = tuple(
+            tuple(range(stack * self.geometry.box_cols, (stack + 1) * self.geometry.box_cols))
+            for stack in range(self.geometry.num_stacks)
+        )
+
+    def get_rows(self, puzzle):
+        # Rows as tuples of ints, with 0 for every cell that is not a digit 1..grid_size
+        n = self.grid_size
+        if isinstance(puzzle, Puzzle):
+            cells = puzzle.cells
+            return [tuple(cells[i:i + n]) for i in range(0, n * n, n)]
+        return [tuple(cell if type(cell) is int and 1 <= cell <= n else 0 for cell in row) for row in puzzle]
+
+    def arrange(self, row, cells, labels):
+        """
+        Smallest arrangement of a row given the column cells: within each cell (columns
+        that are still interchangeable) empty cells come first, then known labels in
+        ascending order, then digits not seen yet, which take the next free labels.
+        Returns (values, parts) with parts[k] = (empty, known, fresh) columns of cell k.
+        """
+        values = []
+        parts = []
+        next_label = len(labels) + 1
+        for cell in cells:
+            empty, known, fresh = [], [], []
+            for c in cell:
+                v = row[c]
+                if not v:
+                    empty.append(c)
+                elif v in labels:
+                    known.append((labels[v], c))
+                else:
+                    fresh.append(c)
+            known.sort()
+            values.extend([0] * len(empty))
+            values.extend(label for label, _ in known)
+            values.extend(range(next_label, next_label + len(fresh)))
+            next_label += len(fresh)
+            parts.append((empty, [c for _, c in known], fresh))
+        return tuple(values), parts
+
+    def count_refinements(self, parts):
+        # Number of states refine(row, parts, labels) yields
+        total = 1
+        for _, _, fresh in parts:
+            total *= math.factorial(len(fresh))
+        return total
+
+    def refine(self, row, parts, labels):
+        # Every (cells, labels) that realizes the arranged row: empty columns stay one
+        # cell, the other columns become fixed, and fresh digits may come in any order
+        for orders in itertools.product(*(itertools.permutations(fresh) for _, _, fresh in parts)):
+            cells = []
+            new_labels = dict(labels)
+            for (empty, known, _), order in zip(parts, orders):
+                if empty:
+                    cells.append(tuple(empty))
+                cells.extend((c,) for c in known)
+                for c in order:
+                    new_labels[row[c]] = len(new_labels) + 1
+                    cells.append((c,))
+            yield tuple(cells), new_labels
+
+    def canonical_form(self, puzzle):
+        """Return the canonical form of a puzzle as a tuple of grid_size * grid_size ints."""
+        geometry = self.geometry
+        rows = self.get_rows(puzzle)
+        variants = [rows]
+        if geometry.is_square:
+            variants.append([tuple(col) for col in zip(*rows)])
+        box_rows = geometry.box_rows
+
+        # Best first row over all variants, rows and stack orders; each stack starts as
+        # one cell of interchangeable columns
+        best, starts = None, []
+        for stack_order in itertools.permutations(self.stacks):
+            for t, grid in enumerate(variants):
+                for r, row in enumerate(grid):
+                    values, parts = self.arrange(row, stack_order, {})
+                    if best is None or values < best:
+                        best, starts = values, []
+                    if values == best:
+                        starts.append((t, r, parts))
+        canonical = list(best)
+
+        # Frontier states: (variant, column cells, used rows, used bands, labels)
+        if sum(self.count_refinements(parts) for _, _, parts in starts) > MAX_CANONICAL_STATES:
+            return self.relabeled_form(variants)
+        frontier = [
+            (t, cells, (r,), (r // box_rows,), labels)
+            for t, r, parts in starts
+            for cells, labels in self.refine(variants[t][r], parts, {})
+        ]
+
+        for depth in range(1, self.grid_size):
+            best, matches = None, []
+            for t, cells, used, bands, labels in frontier:
+                grid = variants[t]
+                if depth % box_rows:
+                    band = bands[-1]
+                    candidates = [(r, bands) for r in range(band * box_rows, (band + 1) * box_rows) if r not in used]
+                else:
+                    candidates = [
+                        (r, bands + (band,))
+                        for band in range(geometry.num_bands) if band not in bands
+                        for r in range(band * box_rows, (band + 1) * box_rows)
+                    ]
+                for r, new_bands in candidates:
+                    values, parts = self.arrange(grid[r], cells, labels)
+                    if best is None or values < best:
+                        best, matches = values, []
+                    if values == best:
+                        matches.append((t, used + (r,), new_bands, labels, parts))
+            if sum(self.count_refinements(parts) for *_, parts in matches) > MAX_CANONICAL_STATES:
+                return self.relabeled_form(variants)
+            frontier = [
+                (t, cells, used, bands, new_labels)
+                for t, used, bands, labels, parts in matches
+                for cells, new_labels in self.refine(variants[t][used[-1]], parts, labels)
+            ]
+            canonical.extend(best)
+        return tuple(canonical)
+
+    def relabeled_form(self, variants):
+        # Fallback for puzzles whose search would be too large: only digit relabeling and
+        # transposition are taken into account
+        forms = []
+        for grid in variants:
+            labels = {}
+            form = []
+            for row in grid:
+                for v in row:
+                    if v and v not in labels:
+                        labels[v] = len(labels) + 1
+                    form.append(labels[v] if v else 0)
+            forms.append(tuple(form))
+        return min(forms)
+
+    def digest(self, puzzle):
+        """Return the DIGEST_SIZE-byte digest of the puzzle's canonical form."""
+        data = bytes([self.grid_size]) + bytes(self.canonical_form(puzzle))
+        return hashlib.blake2b(data, digest_size=DIGEST_SIZE).digest()
+
+
+@functools.lru_cache(maxsize=None)
+def get_canonicalizer(grid_size):
+    # Shared canonicalizer of a grid size, using its configured sub-grid shape
+    geometry = SudokuConfig.get_geometry(grid_size)
+    return Canonicalizer(grid_size, (geometry.box_rows, geometry.box_cols))
+
+
+class CanonicalIndex:
+    """
+    Persistent set of canonical-form digests.
+
+    The file is a plain sequence of DIGEST_SIZE-byte digests, appended as new puzzles
+    are added; the digests are loaded into an in-memory set when the index is opened,
+    so lookups are O(1). Without a path the index only lives in memory. New digests are
+    appended every flush_every additions; with flush_every=None only flush() and close()
+    write them, so a caller can write the matching records out first.
+    """
+
+    def __init__(self, path=None, flush_every=INDEX_FLUSH_EVERY):
+        self.path = path
+        self.flush_every = flush_every
+        self.digests = set()
+        self.pending = []  # Digests not yet appended to the file
+        if path is not None and os.path.exists(path):
+            with open(path, "rb") as file:
+                data = file.read()
+            usable = len(data) - len(data) % DIGEST_SIZE  # Ignore a partially written digest
+            self.digests.update(data[i:i + DIGEST_SIZE] for i in range(0, usable, DIGEST_SIZE))
+            if usable != len(data):
+                with open(path, "r+b") as file:
+                    file.truncate(usable)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+
+    def __len__(self):
+        return len(self.digests)
+
+    def __contains__(self, digest):
+        return digest in self.digests
+
+    def add(self, digest):
+        """Add a digest; returns False if it was already in the index."""
+        if digest in self.digests:
+            return False
+        self.digests.add(digest)
+        if self.path is not None:
+            self.pending.append(digest)
+            if self.flush_every is not None and len(self.pending) >= self.flush_every:
+                self.flush()
+        return True
+
+    def add_puzzle(self, puzzle, grid_size):
+        """Add a puzzle by its canonical form; returns False if an equivalent puzzle was already in the index."""
+        return self.add(get_canonicalizer(grid_size).digest(puzzle))
+
+    def flush(self):
+        """Append the pending digests to the index file."""
+        if self.pending:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, "ab") as file:
+                file.write(b"".join(self.pending))
+            self.pending = []
+
+    def close(self):
+        if self.path is not None:
+            self.flush()
+
+
+def dedup_file(input_jsonl, output_jsonl, index):
+    """
+    Stream a generator JSONL file and write every record whose puzzle is not equivalent
+    to one already in the index (or earlier in the file) to output_jsonl.
+    Returns (records kept, duplicates dropped).
+    """
+    kept = dropped = 0
+    with open(input_jsonl, "r") as file, JsonlPuzzleWriter(output_jsonl) as writer:
+        for line in file:
+            record = json.loads(line)
+            if index.add_puzzle(record["puzzle"], record["config"]["grid_size"]):
+                writer.write(record)
+                kept += 1
+            else:
+                dropped += 1
+    return kept, dropped
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Drop puzzles that are duplicates up to symmetry from Sudoku JSONL files."
+    )
+    parser.add_argument("inputs", nargs="+", help="Generator JSONL files, deduplicated together in this order.")
+    parser.add_argument("--output-path", required=True, help="Directory for the deduplicated files.")
+    parser.add_argument("--index", default=None,
+                        help="Canonical index file to check against and extend (default: in memory only).")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.output_path, exist_ok=True)
+    with CanonicalIndex(args.index) as index:
+        for input_jsonl in args.inputs:
+            if not os.path.isfile(input_jsonl):
+                print(f"Error: File '{input_jsonl}' does not exist.")
+                exit(1)
+            output_jsonl = os.path.join(args.output_path, os.path.basename(input_jsonl))
+            if os.path.abspath(output_jsonl) == os.path.abspath(input_jsonl):
+                print(f"Error: Output file '{output_jsonl}' would overwrite its input.")
+                exit(1)
+            try:
+                kept, dropped = dedup_file(input_jsonl, output_jsonl, index)
+            except (json.JSONDecodeError, KeyError):
+                print(f"Error: File '{input_jsonl}' is not a generator JSONL file.")
+                exit(1)
+            print(f"{input_jsonl}: kept {kept} puzzles, dropped {dropped} duplicates -> {output_jsonl}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+# Sudoku4LLM/difficulty_grader.py
+
+import argparse
+import functools
+import itertools
+import json
+import os
+
+from config import SudokuConfig  # Sub-grid shape per grid size
+from geometry import get_geometry  # Shared index tables per grid geometry
+from puzzle import Puzzle  # Compact grids
+from puzzle_io import JsonlPuzzleWriter  # Streaming JSONL writer
+
+# Human solving techniques in the order they are tried, with the weight of one application.
+# "guess" is not a technique: it counts the cells left when no technique makes progress.
+TECHNIQUE_WEIGHTS = {
+    "naked_single": 1,
+    "hidden_single": 2,
+    "pointing": 4,
+    "box_line": 4,
+    "naked_pair": 6,
+    "hidden_pair": 8,
+    "x_wing": 12,
+    "guess": 20,
+}
+GRADE_CHUNK_SIZE = 1000  # Records per task when grading files with several workers
+
+
+class DifficultyGrader:
+    """
+    Logical solver that grades puzzles the way a human would solve them.
+
+    Techniques are tried in the order of TECHNIQUE_WEIGHTS, always going back to the
+    simplest one after any progress. Candidates are bitmasks per cell (bit d - 1 stands
+    for digit d). The grade lists how often each technique was applied, the number of
+    steps and a difficulty score: the sum of the weights of all applications, plus the
+    "guess" weight for every cell the techniques cannot fill.
+    """
+
+    def __init__(self, grid_size, sub_grid_size):
+        # sub_grid_size is an int for square sub-grids or a (rows, columns) pair
+        self.geometry = get_geometry(grid_size, sub_grid_size)
+        self.grid_size = grid_size
+        self.full_mask = (1 << grid_size) - 1
+        self.techniques = (
+            ("naked_single", self.naked_single),
+            ("hidden_single", self.hidden_single),
+            ("pointing", self.pointing),
+            ("box_line", self.box_line),
+            ("naked_pair", self.naked_pair),
+            ("hidden_pair", self.hidden_pair),
+            ("x_wing", self.x_wing),
+        )
+
+    def load(self, grid):
+        """
+        Build (values, candidates) from a grid (a Puzzle or a list of lists); any cell that
+        is not a digit 1..grid_size is empty. Returns None if the givens clash.
+        """
+        n, geometry = self.grid_size, self.geometry
+        values = [0] * geometry.num_cells
+        cands = [self.full_mask] * geometry.num_cells
+        cells = grid.cells if isinstance(grid, Puzzle) else itertools.chain.from_iterable(grid)
+        for i, cell in enumerate(cells):
+            if type(cell) is int and 1 <= cell <= n:
+                if not cands[i] >> (cell - 1) & 1:
+                    return None
+                self.place(values, cands, i, 1 << (cell - 1))
+        return values, cands
+
+    def place(self, values, cands, i, bit):
+        # Fill cell i and remove the digit from the candidates of its peers
+        values[i] = bit
+        cands[i] = 0
+        for peer in self.geometry.peers[i]:
+            cands[peer] &= ~bit
+
+    def eliminate(self, cands, cells, mask):
+        # Remove the digits in mask from the candidates of cells; True if any was there
+        changed = False
+        for i in cells:
+            if cands[i] & mask:
+                cands[i] &= ~mask
+                changed = True
+        return changed
+
+    def naked_single(self, values, cands):
+        # A cell with one candidate left takes it
+        steps = 0
+        for i, mask in enumerate(cands):
+            if mask and not mask & (mask - 1):
+                self.place(values, cands, i, mask)
+                steps += 1
+        return steps
+
+    def hidden_single(self, values, cands):
+        # A digit with one possible cell left in a unit goes there
+        steps = 0
+        for unit in self.geometry.units:
+            once = twice = 0
+            for i in unit:
+                twice |= once & cands[i]
+                once |= cands[i]
+            hidden = once & ~twice
+            while hidden:
+                bit = hidden & -hidden
+                hidden ^= bit
+                for i in unit:
+                    if cands[i] & bit:
+                        self.place(values, cands, i, bit)
+                        steps += 1
+                        break
+        return steps
+
+    def pointing(self, values, cands):
+        # A digit confined to one line within a sub-grid is removed from the rest of that line
+        geometry = self.geometry
+        for box in geometry.boxes:
+            for d in range(self.grid_size):
+                bit = 1 << d
+                cells = [i for i in box if cands[i] & bit]
+                if len(cells) < 2:
+                    continue
+                for index, lines in ((geometry.cell_row, geometry.rows), (geometry.cell_col, geometry.cols)):
+                    line = index[cells[0]]
+                    if all(index[i] == line for i in cells[1:]):
+                        outside = [i for i in lines[line] if geometry.cell_box[i] != geometry.cell_box[cells[0]]]
+                        if self.eliminate(cands, outside, bit):
+                            return 1
+        return 0
+
+    def box_line(self, values, cands):
+        # A digit confined to one sub-grid within a line is removed from the rest of that sub-grid
+        geometry = self.geometry
+        for lines in (geometry.rows, geometry.cols):
+            for line in lines:
+                for d in range(self.grid_size):
+                    bit = 1 << d
+                    cells = [i for i in line if cands[i] & bit]
+                    if len(cells) < 2:
+                        continue
+                    box = geometry.cell_box[cells[0]]
+                    if all(geometry.cell_box[i] == box for i in cells[1:]):
+                        if self.eliminate(cands, set(geometry.boxes[box]) - set(line), bit):
+                            return 1
+        return 0
+
+    def naked_pair(self, values, cands):
+        # Two cells of a unit with the same two candidates take both digits from the others
+        for unit in self.geometry.units:
+            pairs = {}
+            for i in unit:
+                mask = cands[i]
+                if mask and bin(mask).count("1") == 2:
+                    if mask in pairs:
+                        others = [j for j in unit if j != i and j != pairs[mask]]
+                        if self.eliminate(cands, others, mask):
+                            return 1
+                    else:
+                        pairs[mask] = i
+        return 0
+
+    def hidden_pair(self, values, cands):
+        # Two digits that fit only the same two cells of a unit clear the other candidates there
+        for unit in self.geometry.units:
+            positions = {}
+            for d in range(self.grid_size):
+                cells = tuple(i for i in unit if cands[i] >> d & 1)
+                if len(cells) == 2:
+                    positions.setdefault(cells, []).append(d)
+            for cells, digits in positions.items():
+                if len(digits) >= 2:
+                    keep = (1 << digits[0]) | (1 << digits[1])
+                    if self.eliminate(cands, cells, ~keep & self.full_mask):
+                        return 1
+        return 0
+
+    def x_wing(self, values, cands):
+        # A digit with the same two possible columns in two rows is removed from the rest
+        # of those columns (and the same with rows and columns swapped)
+        geometry = self.geometry
+        for lines, crossing, index in (
+            (geometry.rows, geometry.cols, geometry.cell_col),
+            (geometry.cols, geometry.rows, geometry.cell_row),
+        ):
+            for d in range(self.grid_size):
+                bit = 1 << d
+                seen = {}
+                for line in lines:
+                    cells = [i for i in line if cands[i] & bit]
+                    if len(cells) != 2:
+                        continue
+                    key = (index[cells[0]], index[cells[1]])
+                    if key in seen:
+                        corners = set(cells) | set(seen[key])
+                        others = [i for k in key for i in crossing[k] if i not in corners]
+                        if self.eliminate(cands, others, bit):
+                            return 1
+                    else:
+                        seen[key] = cells
+        return 0
+
+    def grade(self, grid):
+        """
+        Solve the grid with the techniques and return its grade:
+        {"difficulty_score", "techniques": {name: applications}, "steps"}.
+        Returns None if the givens clash.
+        """
+        state = self.load(grid)
+        if state is None:
+            return None
+        values, cands = state
+        usage = {}
+        while 0 in values:
+            for name, technique in self.techniques:
+                steps = technique(values, cands)
+                if steps:
+                    usage[name] = usage.get(name, 0) + steps
+                    break
+            else:
+                # No technique applies: the remaining cells need guessing (or have no solution)
+                usage["guess"] = values.count(0)
+                break
+
+        score = sum(TECHNIQUE_WEIGHTS[name] * count for name, count in usage.items())
+        techniques = {name: usage[name] for name in TECHNIQUE_WEIGHTS if name in usage}
+        return {"difficulty_score": score, "techniques": techniques, "steps": sum(usage.values())}
+
+
+@functools.lru_cache(maxsize=None)
+def get_grader(grid_size):
+    # Shared grader of a grid size, using its configured sub-grid shape
+    geometry = SudokuConfig.get_geometry(grid_size)
+    return DifficultyGrader(grid_size, (geometry.box_rows, geometry.box_cols))
+
+
+def grade_record(record):
+    """Add the grade of a generator JSONL record to its config and return the record."""
+    grade = get_grader(record["config"]["grid_size"]).grade(record["puzzle"])
+    if grade is not None:
+        record["config"].update(grade)
+    return record
+
+
+def grade_lines(lines):
+    # Grade a chunk of JSONL lines; runs inside pool workers
+    return [grade_record(json.loads(line)) for line in lines]
+
+
+def get_band_label(score, bands):
+    # Label of the score band [bands[k], bands[k + 1]) holding score; the last band is open-ended
+    for low, high in zip(bands, bands[1:]):
+        if low <= score < high:
+            return f"score-{low}-{high}"
+    if score >= bands[-1]:
+        return f"score-{bands[-1]}-plus"
+    return f"score-below-{bands[0]}"
+
+
+def grade_file(input_jsonl, output_path, workers=1, bands=None):
+    """
+    Grade every puzzle of a generator JSONL file and write the graded records to
+    output_path/<input name>.jsonl, or with bands (ascending score edges) to one file per
+    score band, output_path/<input name>_<band>.jsonl. The file is streamed in chunks,
+    spread over `workers` processes. Returns the number of graded puzzles.
+    """
+    stem = os.path.splitext(os.path.basename(input_jsonl))[0]
+    os.makedirs(output_path, exist_ok=True)
+    writers = {}
+    count = 0
+    try:
+        with open(input_jsonl, "r") as file:
+            chunks = iter(lambda: list(itertools.islice(file, GRADE_CHUNK_SIZE)), [])
+            if workers > 1:
+                import multiprocessing  # Only needed with several workers
+
+                pool = multiprocessing.Pool(workers)
+                graded_chunks = pool.imap(grade_lines, chunks)
+            else:
+                pool = None
+                graded_chunks = map(grade_lines, chunks)
+            try:
+                for records in graded_chunks:
+                    for record in records:
+                        name = stem
+                        if bands:
+                            name = f"{stem}_{get_band_label(record['config'].get('difficulty_score', 0), bands)}"
+                        if name not in writers:
+                            writers[name] = JsonlPuzzleWriter(os.path.join(output_path, f"{name}.jsonl"))
+                        writers[name].write(record)
+                        count += 1
+            finally:
+                if pool is not None:
+                    pool.close()
+                    pool.join()
+    finally:
+        for writer in writers.values():
+            writer.close()
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Grade Sudoku JSONL files by the solving techniques their puzzles need."
+    )
+    parser.add_argument("inputs", nargs="+", help="Generator JSONL files to grade.")
+    parser.add_argument("--output-path", default=None,
+                        help="Directory for graded files (default: 'graded' next to each input's directory).")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of worker processes (default: 1).")
+    parser.add_argument("--bands", nargs="+", type=int, default=None,
+                        help="Ascending score edges, e.g. 0 50 100; records are split into one file per band.")
+    args = parser.parse_args(argv)
+    if args.bands is not None and args.bands != sorted(args.bands):
+        parser.error("--bands must be in ascending order.")
+
+    for input_jsonl in args.inputs:
+        if not os.path.isfile(input_jsonl):
+            print(f"Error: File '{input_jsonl}' does not exist.")
+            exit(1)
+        output_path = args.output_path
+        if output_path is None:
+            output_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(input_jsonl))), "graded")
+        try:
+            count = grade_file(input_jsonl, output_path, args.workers, args.bands)
+        except (json.JSONDecodeError, KeyError):
+            print(f"Error: File '{input_jsonl}' is not a generator JSONL file.")
+            exit(1)
+        print(f"Graded {count} puzzles from {input_jsonl} into {output_path}.")
+
+
+if __name__ == "__main__":
+    main()
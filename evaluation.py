@@ -0,0 +1,343 @@
+# Sudoku4LLM/evaluation.py
+
+import argparse
+import asyncio
+import concurrent.futures
+import json
+import os
+import random
+import re
+import time
+
+from answer_parser import check_answer, get_format_choice, parse_answer  # Answer grading
+from config import SudokuConfig  # Rule texts and sub-grid shapes
+from formatters import get_formatter  # Renders the mock backend's answers
+from puzzle_io import JsonlPuzzleWriter, get_output_paths  # Streaming JSONL writer, per-input output files
+
+DEFAULT_CONCURRENCY = 16  # Requests in flight at once
+DEFAULT_TIMEOUT = 120.0  # Seconds per request
+DEFAULT_RETRIES = 2  # Extra attempts after a failed request
+RETRY_DELAY = 1.0  # Seconds before the first retry; doubled for every further one
+PROMPT_INSTRUCTION = (
+    "The {size}x{size} puzzle below is written in {format}. Solve it and answer with the "
+    "completed grid in the same format.\n\n"
+)
+PROMPT_PATTERN = re.compile(r"The (\d+)x\d+ puzzle below is written in (.+?)\. Solve it")
+
+
+def build_prompt(record):
+    """Prompt of a converted record: rule text, answer instructions and the converted puzzle."""
+    grid_size = record["config"]["grid_size"]
+    rule = record.get("game_rule") or SudokuConfig.get_rule(grid_size)
+    instruction = PROMPT_INSTRUCTION.format(size=grid_size, format=record["format"])
+    return rule + "\n\n" + instruction + record["converted_puzzle"]
+
+
+class MockBackend:
+    """
+    Local stand-in for a model: reads the puzzle back out of the prompt, solves it and
+    answers with the solution in the prompt's format, inside a code block as models
+    often do. `latency` seconds are waited per request to mimic a remote model, and a
+    share `error_rate` of the answers get one wrong cell (chosen from a seed and the
+    prompt, so runs are reproducible whatever the order of the requests).
+    """
+
+    def __init__(self, latency=0.0, error_rate=0.0, seed=0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.seed = seed
+
+    def answer(self, prompt):
+        from sudoku_generator import get_solver  # Pulls in the whole generator, so only imported on use
+
+        match = PROMPT_PATTERN.search(prompt)
+        if match is None:
+            return "I could not find a puzzle in the prompt."
+        grid_size = int(match.group(1))
+        format_choice = get_format_choice(match.group(2))
+        puzzle = parse_answer(prompt.rsplit("\n\n", 1)[-1], format_choice, grid_size)
+        geometry = SudokuConfig.get_geometry(grid_size)
+        solutions = get_solver(grid_size, (geometry.box_rows, geometry.box_cols)).solve(puzzle)
+        if not solutions:
+            return "This puzzle has no solution."
+        solution = solutions[0]
+
+        rng = random.Random(f"{self.seed}:{prompt}")
+        if rng.random() < self.error_rate:
+            row, col = rng.randrange(grid_size), rng.randrange(grid_size)
+            solution[row][col] = solution[row][col] % grid_size + 1
+        rendered = get_formatter(grid_size, symbols=True).renderers[format_choice](solution)
+        return f"Here is the solved puzzle:\n\n```\n{rendered}\n```"
+
+    async def complete(self, prompt):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self.answer(prompt)
+
+
+class HttpBackend:
+    """
+    Model behind an OpenAI-compatible chat completions endpoint, such as a vLLM or
+    llama.cpp server, or the mock server (serve_mock). Requests run in a thread pool
+    sized to the runner's concurrency, so the event loop never blocks on I/O.
+    """
+
+    def __init__(self, url, model=None, api_key=None, max_tokens=None, temperature=0.0, timeout=DEFAULT_TIMEOUT):
+        self.url = url
+        self.timeout = timeout
+        self.model = model
+        self.api_key = api_key
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+
+    def request(self, prompt):
+        import urllib.request  # Only needed for the HTTP backend
+
+        body = {"messages": [{"role": "user", "content": prompt}], "temperature": self.temperature}
+        if self.model is not None:
+            body["model"] = self.model
+        if self.max_tokens is not None:
+            body["max_tokens"] = self.max_tokens
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        request = urllib.request.Request(self.url, json.dumps(body).encode("utf-8"), headers)
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            data = json.load(response)
+        try:
+            return data["choices"][0]["message"]["content"]
+        except (KeyError, IndexError, TypeError):
+            raise ValueError("Response is not a chat completion.")
+
+    async def complete(self, prompt):
+        return await asyncio.get_running_loop().run_in_executor(None, self.request, prompt)
+
+
+async def evaluate_record(index, record, backend, timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES):
+    """Ask the backend for an answer to one converted record and grade it. Returns the result record."""
+    prompt = build_prompt(record)
+    started = time.perf_counter()
+    answer = error = None
+    attempts = 0
+    while attempts <= retries:
+        attempts += 1
+        try:
+            answer = await asyncio.wait_for(backend.complete(prompt), timeout)
+            error = None
+            break
+        except Exception as e:  # Any backend failure is recorded; the run goes on
+            error = f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
+            if attempts <= retries:
+                await asyncio.sleep(RETRY_DELAY * 2 ** (attempts - 1))
+
+    grid_size = record["config"]["grid_size"]
+    result = {
+        "index": index,
+        "format": record["format"],
+        "grid_size": grid_size,
+        "answer": answer,
+        "grid": None,
+        "parse_error": None,
+        "complete": False,
+        "matches_givens": False,
+        "valid": False,
+        "correct": False,
+        "attempts": attempts,
+        "latency_ms": round((time.perf_counter() - started) * 1000, 3),
+        "error": error,
+        "config": record["config"],
+    }
+    if answer is not None:
+        try:
+            grid = parse_answer(answer, get_format_choice(record["format"]), grid_size)
+        except ValueError as e:
+            result["parse_error"] = str(e)
+        else:
+            result["grid"] = grid
+            result.update(check_answer(grid, record["original_puzzle"]))
+    return result
+
+
+class EvaluationSummary:
+    """Answer counts per format of an evaluation run."""
+
+    def __init__(self):
+        self.formats = {}  # format -> {"total", "answered", "parsed", "correct"}
+
+    def add(self, result):
+        counts = self.formats.setdefault(result["format"], {"total": 0, "answered": 0, "parsed": 0, "correct": 0})
+        counts["total"] += 1
+        counts["answered"] += result["answer"] is not None
+        counts["parsed"] += result["grid"] is not None
+        counts["correct"] += result["correct"]
+
+    def lines(self):
+        for name, counts in self.formats.items():
+            yield (f"{name}: {counts['correct']}/{counts['total']} correct "
+                   f"({counts['correct'] / counts['total']:.1%}), {counts['parsed']} parsed, "
+                   f"{counts['total'] - counts['answered']} failed requests")
+
+
+async def evaluate_file(input_jsonl, output_jsonl, backend, concurrency=DEFAULT_CONCURRENCY,
+                        timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES, limit=None):
+    """
+    Evaluate every record of a converted JSONL file. Records are read as they are
+    needed and at most `concurrency` requests are in flight; results are written to
+    output_jsonl as they complete, so their order may differ from the input ("index"
+    gives the input line). Returns an EvaluationSummary.
+    """
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1.")
+    summary = EvaluationSummary()
+    pending = set()
+
+    def collect(done):
+        for task in done:
+            result = task.result()
+            writer.write(result)
+            summary.add(result)
+
+    with open(input_jsonl, "r") as file, JsonlPuzzleWriter(output_jsonl) as writer:
+        try:
+            for index, line in enumerate(file):
+                if limit is not None and index >= limit:
+                    break
+                if len(pending) >= concurrency:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    collect(done)
+                pending.add(asyncio.create_task(evaluate_record(index, json.loads(line), backend, timeout, retries)))
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                collect(done)
+        finally:
+            for task in pending:
+                task.cancel()
+    return summary
+
+
+async def evaluate_files(inputs, output_path, backend, concurrency=DEFAULT_CONCURRENCY,
+                         timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES, limit=None):
+    """
+    Evaluate converted files one after another; returns {output file: EvaluationSummary}.
+    Results go to output_path/evaluated_<input name>, under the input's subdirectory when
+    the inputs come from several directories (see get_output_paths).
+    """
+    output_paths = get_output_paths(inputs, output_path, "evaluated_")
+    # The default executor runs the blocking HTTP requests, one thread per request in flight
+    asyncio.get_running_loop().set_default_executor(concurrent.futures.ThreadPoolExecutor(concurrency))
+    summaries = {}
+    for input_jsonl, output_jsonl in zip(inputs, output_paths):
+        summaries[output_jsonl] = await evaluate_file(
+            input_jsonl, output_jsonl, backend, concurrency, timeout, retries, limit
+        )
+    return summaries
+
+
+def serve_mock(port=8000, backend=None, host="127.0.0.1"):
+    """
+    Serve a MockBackend as an OpenAI-compatible chat completions endpoint, for testing
+    the HTTP path without a model: POST http://host:port/v1/chat/completions.
+    """
+    import http.server  # Only needed to serve the mock backend
+
+    backend = backend or MockBackend()
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_POST(self):
+            try:
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                prompt = body["messages"][-1]["content"]
+            except (ValueError, KeyError, IndexError, TypeError):
+                self.send_error(400, "Expected a chat completion request.")
+                return
+            if backend.latency:
+                time.sleep(backend.latency)
+            data = json.dumps({
+                "object": "chat.completion",
+                "model": body.get("model", "mock"),
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": backend.answer(prompt)}}],
+            }).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass  # Keep the console quiet under load
+
+    server = http.server.ThreadingHTTPServer((host, port), Handler)
+    print(f"Mock model serving at http://{host}:{server.server_address[1]}/v1/chat/completions")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Evaluate model answers to converted Sudoku puzzles, with many requests in flight."
+    )
+    parser.add_argument("inputs", nargs="*", help="Converted JSONL files (see format_convertor.py).")
+    parser.add_argument("--output-path", default="evaluations", help="Directory for the result files.")
+    parser.add_argument("--backend", choices=["mock", "http"], default="mock",
+                        help="mock answers locally; http calls a chat completions endpoint (default: mock).")
+    parser.add_argument("--url", default="http://127.0.0.1:8000/v1/chat/completions",
+                        help="Endpoint of the http backend (default: %(default)s).")
+    parser.add_argument("--model", default=None, help="Model name sent to the http backend.")
+    parser.add_argument("--max-tokens", type=int, default=None, help="Answer token limit sent to the http backend.")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help="Requests in flight at once (default: %(default)s).")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT,
+                        help="Seconds per request (default: %(default)s).")
+    parser.add_argument("--retries", type=int, default=DEFAULT_RETRIES,
+                        help="Extra attempts after a failed request (default: %(default)s).")
+    parser.add_argument("--limit", type=int, default=None, help="Evaluate only the first records of each file.")
+    parser.add_argument("--mock-latency", type=float, default=0.0, help="Seconds the mock waits per answer.")
+    parser.add_argument("--mock-error-rate", type=float, default=0.0,
+                        help="Share of mock answers with a wrong cell (default: 0).")
+    parser.add_argument("--serve-mock", type=int, default=None, metavar="PORT",
+                        help="Serve the mock as an http endpoint on PORT instead of evaluating.")
+    args = parser.parse_args(argv)
+
+    mock = MockBackend(args.mock_latency, args.mock_error_rate)
+    if args.serve_mock is not None:
+        serve_mock(args.serve_mock, mock)
+        return
+    if not args.inputs:
+        parser.error("no input files given.")
+    for input_jsonl in args.inputs:
+        if not os.path.isfile(input_jsonl):
+            print(f"Error: File '{input_jsonl}' does not exist.")
+            exit(1)
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1.")
+
+    if args.backend == "http":
+        backend = HttpBackend(args.url, args.model, os.environ.get("OPENAI_API_KEY"), args.max_tokens,
+                              timeout=args.timeout)
+    else:
+        backend = mock
+    started = time.perf_counter()
+    try:
+        summaries = asyncio.run(evaluate_files(
+            args.inputs, args.output_path, backend, args.concurrency, args.timeout, args.retries, args.limit
+        ))
+    except (json.JSONDecodeError, KeyError):
+        print("Error: The inputs are not converted JSONL files.")
+        exit(1)
+    except ValueError as e:
+        print(f"Error: {e}")
+        exit(1)
+    for output_jsonl, summary in summaries.items():
+        for line in summary.lines():
+            print(line)
+        print(f"Results saved to {output_jsonl}.")
+    print(f"Evaluated in {time.perf_counter() - started:.1f}s.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+# Sudoku4LLM/exact_cover.py
+
+import itertools
+import random
+
+from geometry import get_geometry  # Shared index tables per grid geometry
+from puzzle import Puzzle  # Compact grids
+
+
+class ExactCover:
+    """
+    Dancing Links (Algorithm X) over a sparse 0/1 matrix, searched iteratively.
+
+    rows is a list of column-index tuples; a solution is a set of rows that covers every
+    column exactly once. The search keeps its own explicit stack instead of recursing,
+    so deep searches on large grids are not limited by Python's recursion depth. The
+    links are always restored after a search, so one matrix can be searched many times.
+    """
+
+    def __init__(self, num_columns, rows):
+        # Node 0 is the root, nodes 1..num_columns the column headers, then the row nodes
+        size = 1 + num_columns + sum(len(row) for row in rows)
+        self.L = L = list(range(-1, size - 1))
+        self.R = R = list(range(1, size + 1))
+        self.U = U = list(range(size))
+        self.D = D = list(range(size))
+        self.C = C = list(range(size))
+        self.S = S = [0] * (1 + num_columns)  # Rows left in each column
+        self.ROW = ROW = [-1] * size  # Row index of each node
+        self.nodes = self.dead_ends = 0  # Rows tried and dead ends of the last search
+        L[0], R[num_columns] = num_columns, 0
+
+        node = 1 + num_columns
+        for row_index, columns in enumerate(rows):
+            first, last = node, node + len(columns) - 1
+            for column in columns:
+                # Append the node at the bottom of its column and link it into its row
+                column += 1
+                C[node], ROW[node] = column, row_index
+                U[node], D[node] = U[column], column
+                D[U[column]] = node
+                U[column] = node
+                S[column] += 1
+                L[node] = node - 1 if node > first else last
+                R[node] = node + 1 if node < last else first
+                node += 1
+
+    def cover(self, c):
+        L, R, U, D, C, S = self.L, self.R, self.U, self.D, self.C, self.S
+        L[R[c]] = L[c]
+        R[L[c]] = R[c]
+        i = D[c]
+        while i != c:
+            j = R[i]
+            while j != i:
+                U[D[j]] = U[j]
+                D[U[j]] = D[j]
+                S[C[j]] -= 1
+                j = R[j]
+            i = D[i]
+
+    def uncover(self, c):
+        L, R, U, D, C, S = self.L, self.R, self.U, self.D, self.C, self.S
+        i = U[c]
+        while i != c:
+            j = L[i]
+            while j != i:
+                S[C[j]] += 1
+                U[D[j]] = j
+                D[U[j]] = j
+                j = L[j]
+            i = U[i]
+        L[R[c]] = c
+        R[L[c]] = c
+
+    def select(self, r):
+        # Cover the other columns of row node r (its own column is already covered)
+        j = self.R[r]
+        while j != r:
+            self.cover(self.C[j])
+            j = self.R[j]
+
+    def unselect(self, r):
+        j = self.L[r]
+        while j != r:
+            self.uncover(self.C[j])
+            j = self.L[j]
+
+    def search(self, limit=1, rng=None, node_budget=None):
+        """
+        Return up to `limit` solutions, each a list of row indices. Candidate rows are
+        shuffled with rng if given. Returns None if more than node_budget rows had to
+        be tried.
+        """
+        R, D, S, ROW = self.R, self.D, self.S, self.ROW
+        solutions = []
+        stack = []  # Frames of [column, candidate row nodes, index of the chosen one]
+        nodes = dead_ends = 0
+        exhausted = False
+
+        descend = True
+        while descend:
+            # Pick the column with the fewest remaining rows
+            best, best_size = 0, None
+            c = R[0]
+            while c != 0:
+                if best_size is None or S[c] < best_size:
+                    best, best_size = c, S[c]
+                    if best_size <= 1:
+                        break
+                c = R[c]
+
+            if best == 0:
+                solutions.append([ROW[frame[1][frame[2]]] for frame in stack])
+                if len(solutions) >= limit:
+                    break
+            elif best_size:
+                candidates = []
+                i = D[best]
+                while i != best:
+                    candidates.append(i)
+                    i = D[i]
+                if rng is not None:
+                    rng.shuffle(candidates)
+                self.cover(best)
+                self.select(candidates[0])
+                stack.append([best, candidates, 0])
+                nodes += 1
+                if node_budget is not None and nodes > node_budget:
+                    exhausted = True
+                    break
+                continue
+
+            if best:
+                dead_ends += 1  # A column no row can cover
+            # Backtrack to the deepest frame with an untried candidate
+            descend = False
+            while stack:
+                frame = stack[-1]
+                self.unselect(frame[1][frame[2]])
+                frame[2] += 1
+                if frame[2] < len(frame[1]):
+                    self.select(frame[1][frame[2]])
+                    nodes += 1
+                    descend = True
+                    break
+                self.uncover(frame[0])
+                stack.pop()
+
+        # Restore the links when the search stopped early
+        while stack:
+            column, candidates, index = stack.pop()
+            self.unselect(candidates[index])
+            self.uncover(column)
+        self.nodes, self.dead_ends = nodes, dead_ends
+        return None if exhausted else solutions
+
+
+class ExactCoverSolver:
+    """
+    Sudoku engine for large grids such as 16x16 and 25x25, built on ExactCover.
+
+    Each (cell, digit) candidate is a matrix row covering four constraints: the cell is
+    filled, and the digit appears in its row, its column and its sub-grid. Givens are
+    not put into the matrix at all: only the empty cells' candidates and the constraints
+    the givens leave open are, so nearly complete grids make small matrices. The
+    interface matches SudokuSolver: solve, count_solutions, has_unique_solution,
+    fill_random and make_uniqueness_checker.
+    """
+
+    def __init__(self, grid_size, sub_grid_size):
+        self.geometry = get_geometry(grid_size, sub_grid_size)
+        self.grid_size = grid_size
+        self.sub_grid_size = sub_grid_size
+        self.num_cells = grid_size * grid_size
+        self.full_mask = (1 << grid_size) - 1
+        self.empty_problem = None  # Matrix of the empty grid, reused by fill_random
+        self.search_nodes = 0  # Rows tried by all searches so far, for instrumentation
+        self.backtracks = 0  # Dead ends of all searches so far
+
+    def build_problem(self, grid, excluded=None):
+        """
+        Build the exact cover matrix for the empty cells of grid (a Puzzle or a list of
+        lists). excluded is an optional
+        (cell, digit) candidate to leave out. Returns (matrix, candidates) where
+        candidates[i] is the (cell, digit) of matrix row i, or None if the givens clash.
+        """
+        n, geometry = self.grid_size, self.geometry
+        rows, cols, boxes = [0] * n, [0] * n, [0] * n
+        empty = []
+        values = grid.cells if isinstance(grid, Puzzle) else itertools.chain.from_iterable(grid)
+        for cell, value in enumerate(values):
+            if type(value) is int and 1 <= value <= n:
+                bit = 1 << (value - 1)
+                r, c, b = geometry.cell_row[cell], geometry.cell_col[cell], geometry.cell_box[cell]
+                if (rows[r] | cols[c] | boxes[b]) & bit:
+                    return None
+                rows[r] |= bit
+                cols[c] |= bit
+                boxes[b] |= bit
+            else:
+                empty.append(cell)
+
+        # Number the open constraints: empty cells, then missing digits per row, column, box
+        column_ids = {}
+        for cell in empty:
+            column_ids[cell] = len(column_ids)
+        for kind, used in ((1, rows), (2, cols), (3, boxes)):
+            for unit in range(n):
+                for d in range(n):
+                    if not used[unit] >> d & 1:
+                        column_ids[kind, unit, d] = len(column_ids)
+
+        matrix_rows, candidates = [], []
+        for cell in empty:
+            r, c, b = geometry.cell_row[cell], geometry.cell_col[cell], geometry.cell_box[cell]
+            free = self.full_mask & ~(rows[r] | cols[c] | boxes[b])
+            for d in range(n):
+                if free >> d & 1 and (cell, d + 1) != excluded:
+                    matrix_rows.append((
+                        column_ids[cell], column_ids[1, r, d], column_ids[2, c, d], column_ids[3, b, d]
+                    ))
+                    candidates.append((cell, d + 1))
+        return ExactCover(len(column_ids), matrix_rows), candidates
+
+    def to_grid(self, grid, candidates, solution):
+        # Combine the givens of grid with the chosen candidates into a solved grid
+        n = self.grid_size
+        solved = [[value if type(value) is int and 1 <= value <= n else 0 for value in line] for line in grid]
+        for row_index in solution:
+            cell, digit = candidates[row_index]
+            solved[cell // n][cell % n] = digit
+        return solved
+
+    def solve(self, grid, limit=1, rng=None, excluded=None, node_budget=None):
+        """
+        Return up to `limit` solutions of the grid as lists of lists, or None if
+        node_budget search nodes were not enough. excluded is an optional (cell, digit)
+        candidate that solutions may not use.
+        """
+        problem = self.build_problem(grid, excluded)
+        if problem is None:
+            return []
+        matrix, candidates = problem
+        solutions = matrix.search(limit, rng, node_budget)
+        self.search_nodes += matrix.nodes
+        self.backtracks += matrix.dead_ends
+        if solutions is None:
+            return None
+        return [self.to_grid(grid, candidates, solution) for solution in solutions]
+
+    def count_solutions(self, grid, limit=2):
+        """Count the solutions of the grid, stopping once `limit` are found."""
+        return len(self.solve(grid, limit))
+
+    def has_unique_solution(self, grid):
+        """Check whether the grid has exactly one solution."""
+        return self.count_solutions(grid, limit=2) == 1
+
+    def fill_random(self, rng=random, node_budget=None):
+        """
+        Return a random complete grid. Randomized search on large empty grids can wander
+        into dead ends, so each attempt gets a node budget and restarts when it runs out.
+        """
+        n = self.grid_size
+        if self.empty_problem is None:
+            self.empty_problem = self.build_problem([[0] * n for _ in range(n)])
+        matrix, candidates = self.empty_problem
+        if node_budget is None:
+            node_budget = 4 * self.num_cells
+        while True:
+            solutions = matrix.search(1, rng, node_budget)
+            self.search_nodes += matrix.nodes
+            self.backtracks += matrix.dead_ends
+            if solutions:
+                return self.to_grid([[0] * n for _ in range(n)], candidates, solutions[0])
+
+    def make_uniqueness_checker(self, solution, node_budget=None):
+        """Return an ExactCoverUniquenessChecker for removing givens from the solution."""
+        return ExactCoverUniquenessChecker(self, solution, node_budget)
+
+
+class ExactCoverUniquenessChecker:
+    """
+    Uniqueness engine for ExactCoverSolver, mirroring sudoku_solver.UniquenessChecker:
+    after removing a cell from a unique puzzle, only a solution with a different digit
+    in that cell can break uniqueness, so the search leaves the solution's digit out.
+
+    Each search is capped at node_budget nodes (default: twice the number of cells).
+    A cell whose search runs out of budget is kept, so the puzzle stays provably
+    unique; this bounds the time spent on the rare very hard removals of large grids.
+    """
+
+    def __init__(self, solver, solution, node_budget=None):
+        self.solver = solver
+        self.solution = solution.copy() if isinstance(solution, Puzzle) else Puzzle.from_rows(solution)
+        self.grid = self.solution.copy()
+        self.node_budget = node_budget if node_budget is not None else 2 * solver.num_cells
+
+    def try_remove(self, row, col):
+        """
+        Remove the given at (row, col) if the puzzle stays unique.
+        Returns True if the cell was removed, False if it had to be kept.
+        """
+        digit = self.grid[row, col]
+        if not digit:
+            return True
+        self.grid[row, col] = 0
+        alternatives = self.solver.solve(
+            self.grid, 1, excluded=(row * self.solver.grid_size + col, digit), node_budget=self.node_budget
+        )
+        if alternatives is None or alternatives:  # Undecided or not unique: keep the given
+            self.restore(row, col)
+            return False
+        return True
+
+    def restore(self, row, col):
+        """Put the solution's digit back into (row, col); the puzzle stays unique."""
+        self.grid[row, col] = self.solution[row, col]
@@ -1,30 +1,45 @@
 # Sudoku4LLM/format_convertor.py
 
+import argparse
+import contextlib
 import json
 import os
 from config import SudokuConfig  # Importing the config.py module for format options
+from formatters import get_formatter  # Precomputed layouts per grid size
+from puzzle import Puzzle  # Compact grids
+from token_budget import get_token_counter  # Token counts of converted puzzles
+
+# Solution fields of generator records that are copied into converted records
+SOLUTION_FIELDS = ("solution", "solution_count", "solutions")
 
 
 class SudokuFormatConverter:
-    def __init__(self, input_jsonl, output_path):
+    def __init__(self, input_jsonl, output_path, rule_reference=False, token_counter=None):
         self.input_jsonl = input_jsonl
         self.output_path = output_path
+        # When set, records carry "game_rule_id" and the rule texts go to rules.json once
+        self.rule_reference = rule_reference
+        # When set (see token_budget.py), records carry the "token_count" of their converted puzzle
+        self.token_counter = token_counter
 
-    def load_puzzles(self):
-        """Load puzzles from the JSONL file."""
-        puzzles = []
+    def iter_puzzles(self):
+        """
+        Stream puzzles from the JSONL file one record at a time. Like the other methods,
+        problems with the files raise ValueError instead of exiting, so a converter can run
+        inside a long-lived worker; the command line prints them as errors.
+        """
         try:
             with open(self.input_jsonl, "r") as file:
                 for line in file:
-                    puzzle_data = json.loads(line)
-                    puzzles.append(puzzle_data)
+                    yield json.loads(line)
         except FileNotFoundError:
-            print(f"Error: Input file '{self.input_jsonl}' not found.")
-            exit(1)
+            raise ValueError(f"Input file '{self.input_jsonl}' not found.")
         except json.JSONDecodeError:
-            print(f"Error: File '{self.input_jsonl}' is not in valid JSONL format.")
-            exit(1)
-        return puzzles
+            raise ValueError(f"File '{self.input_jsonl}' is not in valid JSONL format.")
+
+    def load_puzzles(self):
+        """Load puzzles from the JSONL file."""
+        return list(self.iter_puzzles())
 
     def save_to_jsonl(self, converted_puzzles, format_name):
         """Save the converted puzzles to a JSONL file."""
@@ -37,83 +52,71 @@ class SudokuFormatConverter:
                     file.write("\n")
             print(f"Converted puzzles saved in JSONL format to: {output_file}")
         except PermissionError:
-            print(f"Error: Unable to write to directory '{self.output_path}'. Check your permissions.")
-            exit(1)
+            raise ValueError(f"Unable to write to directory '{self.output_path}'. Check your permissions.")
         except Exception as e:
-            print(f"Error: An unexpected error occurred while saving the file: {e}")
-            exit(1)
+            raise ValueError(f"An unexpected error occurred while saving the file: {e}")
+
+    def save_rules(self):
+        """Write the rule texts referenced by game_rule_id to rules.json in the output directory."""
+        rules_file = os.path.join(self.output_path, "rules.json")
+        rules = {entry["rule_id"]: entry["rules"] for entry in SudokuConfig.get_rule_registry().values()}
+        with open(rules_file, "w") as file:
+            json.dump(rules, file, indent=2)
+        print(f"Rule texts for game_rule_id saved to: {rules_file}")
+
+    def to_symbols(self, puzzle):
+        """
+        Replace digits of 10 and above with letters (A = 10, B = 11, ...), so every cell of
+        a large grid is one character wide in all formats. Grids up to 9x9 are unchanged.
+        """
+        if len(puzzle) <= 9:
+            return puzzle
+        return [[SudokuConfig.get_digit_symbol(cell) for cell in row] for row in puzzle]
+
+    # The convert_to_* methods render digits of 10 and above as letters, as convert_many
+    # does (see to_symbols); the layouts of each grid size are precomputed once by the
+    # shared GridFormatter (see formatters.py)
 
     def convert_to_inline_string(self, puzzle):
         """Convert puzzle to Inline String Format."""
-        return "".join(str(cell) for row in puzzle for cell in row)
+        return get_formatter(len(puzzle), symbols=True).inline_string(puzzle)
 
     def convert_to_row_by_row(self, puzzle):
         """Convert puzzle to Row-by-Row List Format."""
-        return json.dumps(puzzle, indent=2)
+        return get_formatter(len(puzzle), symbols=True).row_by_row(puzzle)
 
     def convert_to_key_value_row(self, puzzle):
         """Convert puzzle to Key-Value Row Mapping."""
-        return json.dumps({f"row_{i + 1}": row for i, row in enumerate(puzzle)}, indent=2)
+        return get_formatter(len(puzzle), symbols=True).key_value_row(puzzle)
 
     def convert_to_grid_with_separators(self, puzzle, separator=True):
         """Convert puzzle to Grid with Separators or Box-Oriented Format."""
-        rows = []
-        grid_size = len(puzzle)
-        sub_grid_size = int(grid_size ** 0.5)  # Dynamically calculate sub-grid size
-        for i, row in enumerate(puzzle):
-            row_parts = []
-            for j in range(0, grid_size, sub_grid_size):
-                row_parts.append(" ".join(map(str, row[j:j + sub_grid_size])))
-            rows.append(" | ".join(row_parts))
-            if separator and (i + 1) % sub_grid_size == 0 and i + 1 != grid_size:
-                rows.append(" | ".join("-" * len(part) for part in row_parts))
-        return "\n".join(rows)
+        return get_formatter(len(puzzle), symbols=True).grid_with_separators(puzzle, separator)
 
     def convert_to_csv(self, puzzle):
         """Convert puzzle to CSV Format."""
-        return "\n".join(",".join(map(str, row)) for row in puzzle)
+        return get_formatter(len(puzzle), symbols=True).csv(puzzle)
 
     def convert_to_coordinate_list(self, puzzle, sparse=False):
         """Convert puzzle to Coordinate List or Sparse Coordinate Format."""
-        if sparse:
-            return ", ".join(f"({i + 1},{j + 1})={cell}"
-                             for i, row in enumerate(puzzle)
-                             for j, cell in enumerate(row) if cell != 0)
-        else:
-            return str([(i + 1, j + 1, cell)
-                        for i, row in enumerate(puzzle)
-                        for j, cell in enumerate(row) if cell != 0])
+        formatter = get_formatter(len(puzzle), symbols=True)
+        return formatter.sparse_coordinate(puzzle) if sparse else formatter.coordinate_list(puzzle)
 
     def convert_to_markdown_table(self, puzzle):
         """Convert puzzle to Markdown Table Format."""
-        grid_size = len(puzzle)
-        rows = ["|   | " + " | ".join(map(str, range(1, grid_size + 1))) + " |"]
-        rows.append("|---|" + "---|" * grid_size)
-        for i, row in enumerate(puzzle):
-            rows.append(f"| {chr(65 + i)} | " + " | ".join(map(str, row)) + " |")
-        return "\n".join(rows)
+        return get_formatter(len(puzzle), symbols=True).markdown_table(puzzle)
 
     def convert_to_alphanumeric_keyed(self, puzzle):
         """Convert puzzle to Alphanumeric Keyed Format."""
-        return json.dumps({f"{chr(65 + i)}{j + 1}": cell
-                           for i, row in enumerate(puzzle)
-                           for j, cell in enumerate(row) if cell != 0}, indent=2)
+        return get_formatter(len(puzzle), symbols=True).alphanumeric_keyed(puzzle)
 
     def convert_to_xml(self, puzzle):
         """Convert puzzle to XML Format."""
-        rows = ["<sudoku>"]
-        for i, row in enumerate(puzzle):
-            rows.append(f'  <row index="{i + 1}">' + ",".join(map(str, row)) + "</row>")
-        rows.append("</sudoku>")
-        return "\n".join(rows)
+        return get_formatter(len(puzzle), symbols=True).xml(puzzle)
 
-    def convert(self, format_choice):
-        """Convert puzzles to the selected format, include game_rule and directly use config."""
-        puzzles = self.load_puzzles()
-        converted_puzzles = []
-
-        # Mapping format_choice to corresponding conversion methods
-        format_methods = {
+    def get_format_methods(self):
+        """Map each format_choice to its description and conversion method."""
+        return {
             1: ("Inline String Format", self.convert_to_inline_string),
             2: ("Row-by-Row List Format", self.convert_to_row_by_row),
             3: ("Key-Value Row Mapping", self.convert_to_key_value_row),
@@ -127,36 +130,148 @@ class SudokuFormatConverter:
             11: ("XML Format", self.convert_to_xml)
         }
 
-        if format_choice not in format_methods:
-            print(f"Error: Invalid format choice '{format_choice}'. Please choose a number between 1 and 11.")
-            exit(1)
+    def convert(self, format_choice):
+        """Convert puzzles to the selected format, include game_rule and directly use config."""
+        self.convert_many([format_choice])
+
+    def convert_many(self, format_choices):
+        """
+        Convert puzzles to several formats in a single pass over the input.
+        Each puzzle is read and parsed once, then fanned out to every requested
+        formatter and written straight to that format's output file. The parts of a
+        record that all formats share (puzzle, solution, rule, config) are serialized
+        once per puzzle and spliced into every format's line.
+        """
+        format_methods = self.get_format_methods()
+        for format_choice in format_choices:
+            if format_choice not in format_methods:
+                raise ValueError(f"Invalid format choice '{format_choice}'. Please choose a number between 1 and 11.")
+        selected = [format_methods[format_choice] for format_choice in format_choices]
 
-        # Get the format description and function
-        description, format_function = format_methods[format_choice]
+        try:
+            os.makedirs(self.output_path, exist_ok=True)
+            with contextlib.ExitStack() as stack:
+                # Open one output file per format; records are written as they are produced
+                outputs = []
+                for description, format_function in selected:
+                    output_file = os.path.join(
+                        self.output_path, f"converted_{description.replace(' ', '_').lower()}.jsonl"
+                    )
+                    outputs.append((output_file, stack.enter_context(open(output_file, "w"))))
 
-        # Apply the selected format method to each puzzle
-        for puzzle_data in puzzles:
-            puzzle = puzzle_data["puzzle"]
-            config = puzzle_data["config"]  # Directly use the "config" from the original data
+                # Each line is {"original_puzzle", solution fields, "converted_puzzle", optional
+                # "token_count", "format", game rule (or its ID), "config"}, as json.dump would write it
+                rule_key = "game_rule_id" if self.rule_reference else "game_rule"
+                format_suffixes = [f', "format": {json.dumps(description)}, ' for description, _ in selected]
+                rule_parts = {}  # Serialized game rule per grid size
+                renderers = {}  # Format renderers per grid size
+                for puzzle_data in self.iter_puzzles():
+                    puzzle = puzzle_data["puzzle"]
+                    config = puzzle_data["config"]  # Directly use the "config" from the original data
+                    try:
+                        grid = Puzzle.from_rows(puzzle)  # Rendered by every format
+                    except ValueError:
+                        grid = puzzle  # Mixed placeholders or odd cells are rendered as given
 
-            # Add game rule based on grid size
-            grid_size = config["grid_size"]
-            game_rule = SudokuConfig.get_configs().get(f"{grid_size}x{grid_size}", {}).get("rules", "Unknown rules").strip()
+                    # Add game rule based on grid size
+                    grid_size = config["grid_size"]
+                    if grid_size not in rule_parts:
+                        rule_value = (
+                            SudokuConfig.get_rule_id(grid_size) if self.rule_reference
+                            else SudokuConfig.get_rule(grid_size)
+                        )
+                        rule_parts[grid_size] = f"{json.dumps(rule_key)}: {json.dumps(rule_value)}, "
+                    size = len(puzzle)
+                    if size not in renderers:
+                        # Letters for digits of 10 and above, see to_symbols
+                        formatter = get_formatter(size, symbols=True)
+                        renderers[size] = [formatter.renderers[format_choice] for format_choice in format_choices]
 
-            # Build the converted puzzle data
-            converted_puzzles.append({
-                "original_puzzle": puzzle,  # Include the original puzzle
-                "converted_puzzle": format_function(puzzle),  # Converted puzzle
-                "format": description,  # Metadata: format name
-                "game_rule": game_rule,  # Game rule
-                "config": config  # Directly include the original config
-            })
+                    # Carry the stored solution fields over so answers can be graded without solving
+                    head = '{"original_puzzle": ' + json.dumps(puzzle)
+                    for key in SOLUTION_FIELDS:
+                        if key in puzzle_data:
+                            head += f', "{key}": {json.dumps(puzzle_data[key])}'
+                    head += ', "converted_puzzle": '
+                    tail = rule_parts[grid_size] + '"config": ' + json.dumps(config) + "}\n"
 
-        # Save all converted puzzles in JSONL format
-        self.save_to_jsonl(converted_puzzles, description.replace(" ", "_").lower())
+                    for render, format_suffix, (output_file, file) in zip(renderers[size], format_suffixes, outputs):
+                        converted = render(grid)
+                        if self.token_counter is None:
+                            file.write(head + json.dumps(converted) + format_suffix + tail)
+                        else:
+                            file.write(head + json.dumps(converted) + ', "token_count": '
+                                       + str(self.token_counter.count(converted)) + format_suffix + tail)
 
+            if self.rule_reference:
+                self.save_rules()
+        except PermissionError:
+            raise ValueError(f"Unable to write to directory '{self.output_path}'. Check your permissions.")
 
-if __name__ == "__main__":
+        for output_file, _ in outputs:
+            print(f"Converted puzzles saved in JSONL format to: {output_file}")
+
+
+def resolve_formats(formats):
+    """
+    Turn format choices (numbers, names such as "CSV Format" or "csv_format", or "all")
+    into a list of format numbers.
+    """
+    format_options = SudokuConfig.get_conversion_formats()
+    names = {description.replace(" ", "_").lower(): number for number, description in format_options.items()}
+
+    choices = list(formats) if isinstance(formats, (list, tuple)) else [formats]
+    numbers = []
+    for choice in choices:
+        if choice == "all":
+            numbers.extend(format_options)
+        elif isinstance(choice, int) or str(choice).isdigit():
+            if int(choice) not in format_options:
+                raise ValueError(f"Invalid format choice '{choice}'. Please choose a number between 1 and 11.")
+            numbers.append(int(choice))
+        elif str(choice).replace(" ", "_").lower() in names:
+            numbers.append(names[str(choice).replace(" ", "_").lower()])
+        else:
+            raise ValueError(f"Invalid format choice '{choice}'.")
+    return list(dict.fromkeys(numbers))  # Drop duplicates, keep order
+
+
+def convert(path, formats="all", output_path=None, rule_reference=False, token_counter=None):
+    """
+    Convert one or more puzzle JSONL files into the given formats without any prompts.
+
+    `path` and `formats` accept single values or lists. Converted files go to
+    `output_path`; when it is omitted, or when several inputs are converted at once,
+    each input gets its own directory named after the input file, by default in the
+    "converted" directory next to the input's "jsonl" directory.
+    With rule_reference, records refer to the rules by "game_rule_id" and the rule
+    texts are written once to rules.json. With a token_counter (see
+    token_budget.get_token_counter), every record gets the "token_count" of its
+    converted puzzle. Returns the list of output directories.
+    """
+    paths = list(path) if isinstance(path, (list, tuple)) else [path]
+    format_numbers = resolve_formats(formats)
+
+    output_dirs = []
+    for input_jsonl in paths:
+        if not os.path.isfile(input_jsonl):
+            raise ValueError(f"File '{input_jsonl}' does not exist.")
+        stem = os.path.splitext(os.path.basename(input_jsonl))[0]
+        if output_path is None:
+            output_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(input_jsonl))), "converted", stem)
+        elif len(paths) > 1:
+            output_dir = os.path.join(output_path, stem)
+        else:
+            output_dir = output_path
+
+        converter = SudokuFormatConverter(input_jsonl, output_dir, rule_reference, token_counter)
+        converter.convert_many(format_numbers)
+        output_dirs.append(output_dir)
+    return output_dirs
+
+
+def interactive_convert():
+    """Ask for the input file, output directory and format, then convert."""
     # Prompt user for input file
     input_jsonl = input("Enter the path to the Sudoku JSONL file you want to convert: ").strip()
     if not os.path.isfile(input_jsonl):
@@ -183,4 +298,37 @@ if __name__ == "__main__":
 
     # Initialize the converter with the user-provided file and directory
     converter = SudokuFormatConverter(input_jsonl, output_path)
-    converter.convert(format_choice)
\ No newline at end of file
+    converter.convert(format_choice)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Convert Sudoku JSONL files into LLM input formats. "
+                    "Without input files, the settings are asked for interactively."
+    )
+    parser.add_argument("inputs", nargs="*", help="Puzzle JSONL files to convert.")
+    parser.add_argument("--formats", nargs="+", default=["all"],
+                        help="Format numbers (1-11) or names, or 'all' (default: all).")
+    parser.add_argument("--output-path", default=None,
+                        help="Directory for converted files (default: 'converted' next to each input's directory).")
+    parser.add_argument("--rule-ref", action="store_true",
+                        help="Store a game_rule_id per record and the rule texts once in rules.json.")
+    parser.add_argument("--count-tokens", action="store_true",
+                        help="Add the token count of the converted puzzle to every record.")
+    parser.add_argument("--vocab", default=None,
+                        help="Local BPE rank file for --count-tokens (default: character heuristic).")
+    args = parser.parse_args(argv)
+
+    try:
+        if not args.inputs:
+            interactive_convert()
+            return
+        token_counter = get_token_counter(args.vocab) if args.count_tokens or args.vocab else None
+        convert(args.inputs, args.formats, args.output_path, args.rule_ref, token_counter)
+    except ValueError as e:
+        print(f"Error: {e}")
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+# Sudoku4LLM/formatters.py
+
+import functools
+import itertools
+import json
+
+from config import SudokuConfig  # Sub-grid shapes and digit symbols
+from puzzle import Puzzle  # Compact grids
+
+
+class TokenCache(dict):
+    """Rendered token of every cell value seen so far; new values are rendered on first use."""
+
+    def __init__(self, render):
+        super().__init__()
+        self.render = render
+        self.cell_tables = {}  # Tokens by Puzzle cell byte, per placeholder (see cell_table)
+
+    def __missing__(self, value):
+        token = self[value] = self.render(value)
+        return token
+
+    def cell_table(self, puzzle):
+        # Token of every cell byte of a Puzzle: digits 1..grid_size, and the placeholder's token for 0
+        key = (type(puzzle.placeholder), puzzle.placeholder)
+        table = self.cell_tables.get(key)
+        if table is None:
+            table = self.cell_tables[key] = [self[puzzle.placeholder]] + [
+                self[digit] for digit in range(1, puzzle.grid_size + 1)
+            ]
+        return table
+
+
+class GridFormatter:
+    """
+    Renders puzzles of one grid size into the 11 conversion formats.
+
+    Everything that only depends on the grid size is built once: %-format templates
+    holding the layout (row labels, separators, brackets and indentation), coordinate
+    keys per cell, and the markdown header. Cell tokens (plain text, JSON and Python
+    literals) are cached per cell value, so rendering a puzzle is one lookup per cell
+    plus a single format call or join. The output is identical to what the converter
+    produced with json.dumps, str() and repr() per cell.
+
+    With symbols, numbers from 10 on are rendered as letters (see
+    SudokuConfig.get_digit_symbol) for grids larger than 9x9.
+    """
+
+    def __init__(self, grid_size, symbols=False):
+        n = self.grid_size = grid_size
+        geometry = SudokuConfig.get_geometry(grid_size)
+        box_rows, box_cols = geometry.box_rows, geometry.box_cols
+
+        if symbols and grid_size > 9:
+            symbol = SudokuConfig.get_digit_symbol
+        else:
+            def symbol(value):
+                return value
+        self.text = TokenCache(lambda value: str(symbol(value)))
+        self.json = TokenCache(lambda value: json.dumps(symbol(value)))
+        self.literal = TokenCache(lambda value: repr(symbol(value)))
+
+        labels = [chr(65 + i) for i in range(n)]  # Row letters A, B, ...
+        row = ",".join(["%s"] * n)
+        self.csv_template = "\n".join([row] * n)
+        self.xml_template = "\n".join(
+            ["<sudoku>"] + [f'  <row index="{i + 1}">{row}</row>' for i in range(n)] + ["</sudoku>"]
+        )
+        self.markdown_template = "\n".join(
+            ["|   | " + " | ".join(map(str, range(1, n + 1))) + " |", "|---|" + "---|" * n]
+            + [f"| {label} | " + " | ".join(["%s"] * n) + " |" for label in labels]
+        )
+        json_row = ",\n".join(["    %s"] * n)
+        self.row_by_row_template = "[\n" + ",\n".join([f"  [\n{json_row}\n  ]"] * n) + "\n]"
+        self.key_value_template = (
+            "{\n" + ",\n".join(f'  "row_{i + 1}": [\n{json_row}\n  ]' for i in range(n)) + "\n}"
+        )
+
+        # Grid layouts for one-character cells; wider cells take the general path
+        box_row = " | ".join([" ".join(["%s"] * box_cols)] * (n // box_cols))
+        separator_row = " | ".join(["-" * (2 * box_cols - 1)] * (n // box_cols))
+        rows = []
+        for i in range(n):
+            rows.append(box_row)
+            if (i + 1) % box_rows == 0 and i + 1 != n:
+                rows.append(separator_row)
+        self.separator_template = "\n".join(rows)
+        self.box_template = "\n".join([box_row] * n)
+        self.box_rows, self.box_cols = box_rows, box_cols
+
+        # Per-cell keys of the formats that only list filled cells, in row-major order
+        cells = [(i, j) for i in range(n) for j in range(n)]
+        self.coordinate_keys = [f"({i + 1}, {j + 1}, " for i, j in cells]
+        self.sparse_keys = [f"({i + 1},{j + 1})=" for i, j in cells]
+        self.alphanumeric_keys = [f'  "{labels[i]}{j + 1}": ' for i, j in cells]
+
+        self.renderers = {
+            1: self.inline_string,
+            2: self.row_by_row,
+            3: self.key_value_row,
+            4: self.grid_with_separators,
+            5: self.csv,
+            6: self.coordinate_list,
+            7: self.box_oriented,
+            8: self.sparse_coordinate,
+            9: self.markdown_table,
+            10: self.alphanumeric_keyed,
+            11: self.xml,
+        }
+
+    def tokens(self, puzzle, cache):
+        # Flat list of the cell tokens of a grid_size x grid_size puzzle
+        if isinstance(puzzle, Puzzle):
+            if puzzle.grid_size != self.grid_size:
+                raise ValueError(f"Puzzle is not a {self.grid_size}x{self.grid_size} grid.")
+            return tuple(map(cache.cell_table(puzzle).__getitem__, puzzle.cells))
+        tokens = tuple(map(cache.__getitem__, itertools.chain.from_iterable(puzzle)))
+        if len(puzzle) != self.grid_size or len(tokens) != self.grid_size * self.grid_size:
+            raise ValueError(f"Puzzle is not a {self.grid_size}x{self.grid_size} grid.")
+        return tokens
+
+    def filled(self, puzzle, keys, cache):
+        # Key and token of every filled cell; only the number 0 counts as empty here
+        if isinstance(puzzle, Puzzle):
+            table = cache.cell_table(puzzle)
+            keep_empty = puzzle.placeholder != 0  # Placeholders other than the number 0 are listed
+            return [key + table[cell] for key, cell in zip(keys, puzzle.cells) if cell or keep_empty]
+        return [key + cache[cell] for key, cell in zip(keys, itertools.chain.from_iterable(puzzle)) if cell != 0]
+
+    def inline_string(self, puzzle):
+        return "".join(self.tokens(puzzle, self.text))
+
+    def row_by_row(self, puzzle):
+        return self.row_by_row_template % self.tokens(puzzle, self.json)
+
+    def key_value_row(self, puzzle):
+        return self.key_value_template % self.tokens(puzzle, self.json)
+
+    def csv(self, puzzle):
+        return self.csv_template % self.tokens(puzzle, self.text)
+
+    def xml(self, puzzle):
+        return self.xml_template % self.tokens(puzzle, self.text)
+
+    def markdown_table(self, puzzle):
+        return self.markdown_template % self.tokens(puzzle, self.text)
+
+    def grid_with_separators(self, puzzle, separator=True):
+        tokens = self.tokens(puzzle, self.text)
+        if sum(map(len, tokens)) == len(tokens):
+            return (self.separator_template if separator else self.box_template) % tokens
+
+        # Cells wider than one character: separator lines follow the width of each part
+        n, box_rows, box_cols = self.grid_size, self.box_rows, self.box_cols
+        rows = []
+        for i in range(n):
+            row = tokens[i * n:(i + 1) * n]
+            row_parts = [" ".join(row[j:j + box_cols]) for j in range(0, n, box_cols)]
+            rows.append(" | ".join(row_parts))
+            if separator and (i + 1) % box_rows == 0 and i + 1 != n:
+                rows.append(" | ".join("-" * len(part) for part in row_parts))
+        return "\n".join(rows)
+
+    def box_oriented(self, puzzle):
+        return self.grid_with_separators(puzzle, separator=False)
+
+    def coordinate_list(self, puzzle):
+        return "[" + ", ".join([entry + ")" for entry in self.filled(puzzle, self.coordinate_keys, self.literal)]) + "]"
+
+    def sparse_coordinate(self, puzzle):
+        return ", ".join(self.filled(puzzle, self.sparse_keys, self.text))
+
+    def alphanumeric_keyed(self, puzzle):
+        entries = self.filled(puzzle, self.alphanumeric_keys, self.json)
+        if not entries:
+            return "{}"
+        return "{\n" + ",\n".join(entries) + "\n}"
+
+    def render_many(self, puzzles, format_choice):
+        """Render a batch of puzzles of this grid size into one format; returns a list of strings."""
+        return list(map(self.renderers[format_choice], puzzles))
+
+
+@functools.lru_cache(maxsize=None)
+def get_formatter(grid_size, symbols=False):
+    """Shared GridFormatter of a grid size."""
+    return GridFormatter(grid_size, symbols)
+
+
+def render_batch(puzzles, format_choice, symbols=True):
+    """
+    Render N puzzles into one format (a number 1-11, see SudokuConfig.get_conversion_formats).
+    Puzzles may mix grid sizes. With symbols, numbers from 10 on become letters as in
+    converted files. Returns a list of strings in the order of the puzzles.
+    """
+    renderers = {}
+    rendered = []
+    for puzzle in puzzles:
+        size = len(puzzle)
+        if size not in renderers:
+            renderers[size] = get_formatter(size, symbols).renderers[format_choice]
+        rendered.append(renderers[size](puzzle))
+    return rendered
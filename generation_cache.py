@@ -0,0 +1,135 @@
+# Sudoku4LLM/generation_cache.py
+
+import hashlib
+import json
+import os
+
+from puzzle import Puzzle  # Puzzles are cached as list-of-lists grids and read back as Puzzles
+from puzzle_io import count_complete_lines  # Drops lines cut short by an interrupted run
+
+SHARD_SIZE = 1024  # Puzzle indices per shard file
+DEFAULT_CACHE_MAX_MB = 1024  # Size of the cache before the least recently used shards are evicted
+KEY_FILE = "key.json"
+
+
+class GenerationCache:
+    """
+    Content-addressed on-disk cache of generated puzzles.
+
+    Each entry is a directory named after the digest of everything that determines the
+    puzzles of a run: grid configuration, difficulty, uniqueness, placeholder, master
+    seed, the generation options that change the output and the generator version.
+    Puzzle i of an entry lives in shard i // SHARD_SIZE, a JSONL file of
+    [index, seed, puzzle, solution info, config fields] lines. Shards may have gaps,
+    so a request that partly overlaps earlier runs only generates the missing indices.
+
+    Reading a shard marks it as recently used; once the cache holds more than
+    max_bytes, the least recently used shards are deleted (see evict).
+    """
+
+    def __init__(self, path, max_bytes=DEFAULT_CACHE_MAX_MB * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = self.misses = 0
+
+    def entry(self, key):
+        """Directory of the entry for a key (a JSON-serializable dict); created on first use."""
+        data = json.dumps(key, sort_keys=True)
+        directory = os.path.join(self.path, hashlib.blake2b(data.encode("utf-8"), digest_size=16).hexdigest())
+        if not os.path.isdir(directory):
+            os.makedirs(directory, exist_ok=True)
+            with open(os.path.join(directory, KEY_FILE), "w") as file:
+                json.dump(key, file, indent=2, sort_keys=True)
+        return directory
+
+    def shard_path(self, directory, shard):
+        return os.path.join(directory, f"shard-{shard:06d}.jsonl")
+
+    def load_shard(self, directory, shard):
+        # Cached puzzles of a shard as {index: (seed, puzzle, solution info, config fields)}
+        path = self.shard_path(directory, shard)
+        items = {}
+        if not count_complete_lines(path):
+            return items
+        with open(path, "r") as file:
+            for line in file:
+                index, seed, puzzle, solution_info, config_fields = json.loads(line)
+                items[index] = (seed, Puzzle.from_rows(puzzle), solution_info, config_fields)
+        os.utime(path)  # Recently used
+        return items
+
+    def iter_puzzles(self, directory, start, stop, generate, stats=None):
+        """
+        Yield the (seed, puzzle, solution info, config fields) tuples of puzzles
+        start..stop-1 in index order, like iter_sudoku_puzzles. Cached puzzles are read
+        from disk; the missing ones come from generate(first, last), which must yield
+        the puzzles of [first, last) in order, and are added to the cache.
+        """
+        for shard in range(start // SHARD_SIZE, (stop - 1) // SHARD_SIZE + 1) if stop > start else ():
+            cached = self.load_shard(directory, shard)
+            indices = range(max(start, shard * SHARD_SIZE), min(stop, (shard + 1) * SHARD_SIZE))
+
+            # Runs [first, last) of the shard's indices that are not cached, generated lazily
+            runs = []
+            for index in indices:
+                if index in cached:
+                    continue
+                if runs and runs[-1][1] == index:
+                    runs[-1][1] += 1
+                else:
+                    runs.append([index, index + 1])
+            generated = (item for first, last in runs for item in generate(first, last))
+
+            new = []
+            try:
+                for index in indices:
+                    item = cached.get(index)
+                    if item is None:
+                        item = cached[index] = next(generated)
+                        new.append(index)
+                        self.misses += 1
+                    else:
+                        self.hits += 1
+                        if stats is not None:
+                            stats.count("cache_hits")
+                    yield item
+            finally:
+                generated.close()
+                if new:
+                    with open(self.shard_path(directory, shard), "a") as file:
+                        file.writelines(self.dump_item(index, cached[index]) for index in new)
+
+    def dump_item(self, index, item):
+        # Shard line of a puzzle; Puzzles are stored as list-of-lists grids
+        seed, puzzle, solution_info, config_fields = item
+        if isinstance(puzzle, Puzzle):
+            puzzle = puzzle.to_rows()
+        return json.dumps([index, seed, puzzle, solution_info, config_fields]) + "\n"
+
+    def size(self):
+        """Total bytes of all shard files."""
+        return sum(size for _, size, _ in self.iter_shards())
+
+    def iter_shards(self):
+        # (path, size, last use) of every shard in the cache
+        if not os.path.isdir(self.path):
+            return
+        for entry in os.scandir(self.path):
+            if not entry.is_dir():
+                continue
+            for shard in os.scandir(entry.path):
+                if shard.name.startswith("shard-"):
+                    status = shard.stat()
+                    yield shard.path, status.st_size, status.st_mtime
+
+    def evict(self):
+        """Delete the least recently used shards until the cache fits max_bytes. Returns the bytes freed."""
+        shards = sorted(self.iter_shards(), key=lambda shard: shard[2])
+        total = sum(size for _, size, _ in shards)
+        freed = 0
+        for path, size, _ in shards:
+            if total - freed <= self.max_bytes:
+                break
+            os.remove(path)
+            freed += size
+        return freed
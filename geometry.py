@@ -0,0 +1,81 @@
+# Sudoku4LLM/geometry.py
+
+import functools
+
+
+class SudokuGeometry:
+    """
+    Precomputed index tables for an n x n grid split into box_rows x box_cols sub-grids.
+
+    Cells are numbered row by row (cell = row * n + col). The tables are built once per
+    geometry (see get_geometry) and shared by the solver, the generator and the
+    converters, so no box arithmetic is needed in hot loops.
+    """
+
+    def __init__(self, grid_size, box_rows, box_cols):
+        if grid_size <= 0 or box_rows <= 0 or box_cols <= 0:
+            raise ValueError("grid_size and the sub-grid dimensions must be positive integers.")
+        if box_rows * box_cols != grid_size:
+            raise ValueError(
+                f"A {box_rows}x{box_cols} sub-grid holds {box_rows * box_cols} cells, "
+                f"but a {grid_size}x{grid_size} grid needs sub-grids of {grid_size} cells."
+            )
+
+        self.grid_size = grid_size
+        self.box_rows = box_rows
+        self.box_cols = box_cols
+        self.num_cells = grid_size * grid_size
+        self.boxes_per_row = grid_size // box_cols  # Sub-grids side by side in a band
+        self.num_bands = grid_size // box_rows  # Horizontal bands of sub-grids
+        self.num_stacks = grid_size // box_cols  # Vertical stacks of sub-grids
+
+        # Row, column and sub-grid index of every cell
+        cells = range(self.num_cells)
+        self.cell_row = tuple(i // grid_size for i in cells)
+        self.cell_col = tuple(i % grid_size for i in cells)
+        self.cell_box = tuple(
+            (self.cell_row[i] // box_rows) * self.boxes_per_row + self.cell_col[i] // box_cols for i in cells
+        )
+
+        # Cells of every row, column and sub-grid; units lists all of them
+        self.rows = tuple(tuple(r * grid_size + c for c in range(grid_size)) for r in range(grid_size))
+        self.cols = tuple(tuple(r * grid_size + c for r in range(grid_size)) for c in range(grid_size))
+        boxes = [[] for _ in range(grid_size)]
+        for i in cells:
+            boxes[self.cell_box[i]].append(i)
+        self.boxes = tuple(tuple(box) for box in boxes)
+        self.units = self.rows + self.cols + self.boxes
+
+        # Peers: the other cells that share a row, column or sub-grid with a cell
+        self.peers = tuple(
+            tuple(sorted((set(self.rows[self.cell_row[i]]) | set(self.cols[self.cell_col[i]])
+                          | set(self.boxes[self.cell_box[i]])) - {i}))
+            for i in cells
+        )
+
+    @property
+    def is_square(self):
+        # Square sub-grids allow transposing the grid
+        return self.box_rows == self.box_cols
+
+
+def get_box_shape(grid_size, sub_grid_size=None):
+    """
+    Normalize a sub-grid size to (box_rows, box_cols). An int means square sub-grids,
+    a pair gives rows and columns; None picks the most square shape that fits grid_size.
+    """
+    if sub_grid_size is None:
+        box_rows = int(grid_size ** 0.5)
+        while grid_size % box_rows:
+            box_rows -= 1
+        return box_rows, grid_size // box_rows
+    if isinstance(sub_grid_size, int):
+        return sub_grid_size, sub_grid_size
+    box_rows, box_cols = sub_grid_size
+    return box_rows, box_cols
+
+
+@functools.lru_cache(maxsize=None)
+def get_geometry(grid_size, sub_grid_size=None):
+    """Return the shared SudokuGeometry for a grid size and sub-grid size (see get_box_shape)."""
+    return SudokuGeometry(grid_size, *get_box_shape(grid_size, sub_grid_size))
@@ -0,0 +1,164 @@
+# Sudoku4LLM/instrumentation.py
+
+import contextlib
+import json
+import os
+import time
+
+METRIC_PREFIX = "sudoku4llm"  # Prefix of the Prometheus metric names
+PROMETHEUS_EXTENSIONS = (".prom", ".txt")  # Stats files written as Prometheus text instead of JSON
+
+
+class GenerationStats:
+    """
+    Counters and per-stage timers of a generation run.
+
+    Stages are timed with `with stats.stage("fill"):`. Time spent in a nested stage is
+    taken off the enclosing one, so every second is attributed to exactly one stage.
+    Worker processes send their stats as plain dicts (as_dict), which the main process
+    merges into the stats of the run; stage times are therefore summed over workers,
+    while run_seconds is the wall-clock time of the run.
+    """
+
+    def __init__(self, labels=None):
+        self.labels = dict(labels or {})  # Run description, e.g. grid size and difficulty
+        self.counters = {}
+        self.timers = {}  # Seconds per stage
+        self.stack = []  # Open stages: [name, start, seconds spent in nested stages]
+        self.started = time.perf_counter()
+
+    def count(self, name, amount=1):
+        """Add amount to the named counter."""
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """Time the enclosed block as the named stage."""
+        frame = [name, time.perf_counter(), 0.0]
+        self.stack.append(frame)
+        try:
+            yield
+        finally:
+            self.stack.pop()
+            elapsed = time.perf_counter() - frame[1]
+            self.timers[name] = self.timers.get(name, 0.0) + elapsed - frame[2]
+            if self.stack:
+                self.stack[-1][2] += elapsed
+
+    def merge(self, data):
+        """Add the counters and timers of as_dict() output, e.g. from a worker process."""
+        for name, value in data["counters"].items():
+            self.count(name, value)
+        for name, seconds in data["timers"].items():
+            self.timers[name] = self.timers.get(name, 0.0) + seconds
+
+    def as_dict(self):
+        return {
+            "labels": dict(self.labels),
+            "counters": dict(self.counters),
+            "timers": {name: round(seconds, 6) for name, seconds in self.timers.items()},
+            "run_seconds": round(time.perf_counter() - self.started, 6),
+        }
+
+    def to_prometheus(self):
+        """Render the stats in the Prometheus text exposition format."""
+        labels = ",".join(f'{key}="{value}"' for key, value in sorted(self.labels.items()))
+
+        def sample(metric, extra=""):
+            # Metric name with the run labels and an optional extra label
+            inner = ",".join(part for part in (labels, extra) if part)
+            return f"{metric}{{{inner}}}" if inner else metric
+
+        lines = []
+        for name in sorted(self.counters):
+            metric = f"{METRIC_PREFIX}_{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{sample(metric)} {self.counters[name]}")
+        metric = f"{METRIC_PREFIX}_stage_seconds_total"
+        lines.append(f"# HELP {metric} Seconds spent per generation stage, summed over workers.")
+        lines.append(f"# TYPE {metric} counter")
+        for name in sorted(self.timers):
+            stage = f'stage="{name}"'
+            lines.append(f"{sample(metric, stage)} {self.timers[name]:.6f}")
+        metric = f"{METRIC_PREFIX}_run_seconds"
+        lines.append(f"# TYPE {metric} gauge")
+        lines.append(f"{sample(metric)} {time.perf_counter() - self.started:.6f}")
+        return "\n".join(lines) + "\n"
+
+    def save(self, path):
+        """Write the stats to path: Prometheus text for .prom/.txt files, JSON otherwise."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w") as file:
+            if path.endswith(PROMETHEUS_EXTENSIONS):
+                file.write(self.to_prometheus())
+            else:
+                json.dump(self.as_dict(), file, indent=2)
+
+
+def timed_stage(stats, name):
+    """Time a block as a stage of stats, or do nothing when stats is None."""
+    if stats is None:
+        return contextlib.nullcontext()
+    return stats.stage(name)
+
+
+class InstrumentedChecker:
+    """
+    Wraps a uniqueness checker (see SudokuSolver.make_uniqueness_checker) to count and
+    time its checks. Only used when a run is instrumented, so plain runs pay nothing.
+    """
+
+    def __init__(self, checker, stats):
+        self.checker = checker
+        self.stats = stats
+
+    def try_remove(self, row, col):
+        with self.stats.stage("uniqueness"):
+            removed = self.checker.try_remove(row, col)
+        self.stats.count("uniqueness_checks")
+        if not removed:
+            self.stats.count("rejected_removals")
+        return removed
+
+    def restore(self, row, col):
+        self.checker.restore(row, col)
+
+
+def format_duration(seconds):
+    # H:MM:SS for progress lines
+    seconds = int(seconds)
+    return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+class ProgressReporter:
+    """
+    Progress lines with rate and ETA for long runs.
+
+    update() is called once per puzzle but only prints when a report is due: every
+    `interval` seconds, or without an interval at every 10% of the run. Rates only count
+    the puzzles of this run, not those already done by an interrupted one.
+    """
+
+    def __init__(self, total, start=0, interval=0, label="Generated"):
+        self.total = total
+        self.start = start
+        self.interval = interval
+        self.label = label
+        self.started = self.last_report = time.monotonic()
+        self.step = max(1, total // 10)
+
+    def update(self, done):
+        now = time.monotonic()
+        if done < self.total:
+            if self.interval:
+                if now - self.last_report < self.interval:
+                    return
+            elif done % self.step:
+                return
+        self.last_report = now
+        elapsed = now - self.started
+        rate = (done - self.start) / elapsed if elapsed > 0 else 0.0
+        eta = format_duration((self.total - done) / rate) if rate > 0 else "?"
+        print(f"{self.label} {done}/{self.total} puzzles ({rate:.1f}/s, ETA {eta})...")
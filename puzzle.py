@@ -0,0 +1,189 @@
+# Sudoku4LLM/puzzle.py
+
+import functools
+import itertools
+
+from geometry import get_geometry  # Peers of every cell
+
+
+class Puzzle:
+    """
+    Compact Sudoku grid. The grid_size * grid_size cells are stored row by row in one
+    bytearray, with 0 for an empty cell; the placeholder written for empty cells is kept
+    once as metadata instead of in every cell. A 9x9 puzzle takes about 210 bytes of
+    memory instead of the 1.3 KB of a list of lists, pickles to 130 bytes instead of 220,
+    and copying one is a single memory copy (see copy).
+
+    A Puzzle also reads like the list-of-lists grids used elsewhere: len() is the grid
+    size, and iterating or indexing with a row number gives rows with the placeholder in
+    empty cells, so the solvers, the grader and the formatters accept either (they use
+    the flat cells directly when given a Puzzle). puzzle[row, col] reads and writes the
+    digit of one cell, 0 when it is empty. to_rows() gives the grid as stored in JSONL.
+    """
+
+    __slots__ = ("grid_size", "cells", "placeholder", "sub_grid_size")
+
+    def __init__(self, grid_size, cells=None, placeholder=0, sub_grid_size=None):
+        # sub_grid_size is an int for square sub-grids, a (rows, columns) pair, or None for the most square shape
+        self.grid_size = grid_size
+        self.cells = bytearray(grid_size * grid_size) if cells is None else bytearray(cells)
+        self.placeholder = placeholder
+        self.sub_grid_size = sub_grid_size
+        if len(self.cells) != grid_size * grid_size:
+            raise ValueError(f"A {grid_size}x{grid_size} puzzle needs {grid_size * grid_size} cells, got {len(self.cells)}.")
+
+    @classmethod
+    def from_rows(cls, rows, placeholder=None, sub_grid_size=None):
+        """
+        Build a Puzzle from a list-of-lists grid. Digits 1..n are kept and every other
+        cell is empty. All empty cells must hold the same placeholder, which is read from
+        the grid when placeholder is None (0 for a grid without empty cells), so to_rows()
+        gives the grid back unchanged. Raises ValueError otherwise.
+        """
+        n = len(rows)
+        flat = list(itertools.chain.from_iterable(rows))
+        if len(flat) != n * n or len(set(map(len, rows))) > 1:
+            raise ValueError(f"Puzzle is not a {n}x{n} grid.")
+        codes = get_cell_codes(n)
+        try:
+            empty = set(flat).difference(codes)  # Values of the empty cells
+        except TypeError:
+            raise ValueError(f"Puzzle holds cells that are neither digits of a {n}x{n} grid nor a placeholder.")
+        if not empty:
+            return cls(n, flat, 0 if placeholder is None else placeholder, sub_grid_size)
+
+        value = empty.pop()
+        if empty or (placeholder is not None and (value != placeholder or type(value) is not type(placeholder))):
+            found = [value, *empty] + ([] if placeholder is None else [placeholder])
+            raise ValueError(f"Puzzle mixes the placeholders {', '.join(map(repr, dict.fromkeys(found)))}.")
+        if type(value) is int and value != 0:
+            raise ValueError(f"Cell value {value} is not a digit of a {n}x{n} grid.")
+        cells = bytearray(map({**codes, value: 0}.__getitem__, flat))
+        return cls(n, cells, value, sub_grid_size)
+
+    @property
+    def geometry(self):
+        # Shared index tables of the grid (see geometry.py)
+        return get_geometry(self.grid_size, self.sub_grid_size)
+
+    def copy(self):
+        """Independent copy; the cells are copied in one go, the metadata is shared."""
+        puzzle = Puzzle.__new__(Puzzle)
+        puzzle.grid_size = self.grid_size
+        puzzle.cells = self.cells[:]
+        puzzle.placeholder = self.placeholder
+        puzzle.sub_grid_size = self.sub_grid_size
+        return puzzle
+
+    def values(self):
+        """Flat list of the cells in row-major order, with the placeholder in empty cells."""
+        placeholder = self.placeholder
+        return [cell if cell else placeholder for cell in self.cells]
+
+    def to_rows(self):
+        """The grid as a list of lists with the placeholder in empty cells, as stored in JSONL."""
+        values = self.values()
+        n = self.grid_size
+        return [values[i:i + n] for i in range(0, n * n, n)]
+
+    def peer_digits(self, row, col):
+        """Set of the digits in the cells that share a row, column or sub-grid with (row, col)."""
+        cells = self.cells
+        digits = {cells[peer] for peer in self.geometry.peers[row * self.grid_size + col]}
+        digits.discard(0)
+        return digits
+
+    def empty_count(self):
+        """Number of empty cells."""
+        return self.cells.count(0)
+
+    def __len__(self):
+        return self.grid_size
+
+    def __iter__(self):
+        return iter(self.to_rows())
+
+    def __getitem__(self, index):
+        if isinstance(index, tuple):
+            row, col = index
+            return self.cells[row * self.grid_size + col]
+        if isinstance(index, slice):
+            return self.to_rows()[index]
+        # One row, read from its slice of the cells rather than the whole grid
+        n = self.grid_size
+        row = index + n if index < 0 else index
+        if not 0 <= row < n:
+            raise IndexError(f"Row {index} out of range for a {n}x{n} puzzle.")
+        placeholder = self.placeholder
+        return [cell if cell else placeholder for cell in self.cells[row * n:(row + 1) * n]]
+
+    def __setitem__(self, index, digit):
+        row, col = index
+        self.cells[row * self.grid_size + col] = digit
+
+    def __eq__(self, other):
+        if not isinstance(other, Puzzle):
+            return NotImplemented
+        return self.grid_size == other.grid_size and self.cells == other.cells
+
+    __hash__ = None  # Mutable
+
+    def __reduce__(self):
+        # Pickle the cells as one bytes object, e.g. when results come back from pool workers
+        return Puzzle, (self.grid_size, bytes(self.cells), self.placeholder, self.sub_grid_size)
+
+    def __repr__(self):
+        return f"Puzzle({self.grid_size}, {bytes(self.cells)!r}, placeholder={self.placeholder!r})"
+
+
+@functools.lru_cache(maxsize=None)
+def get_cell_codes(grid_size):
+    # Byte of every digit of a grid size, for building cells from list-of-lists grids
+    return {digit: digit for digit in range(1, grid_size + 1)}
+
+
+class PuzzleArray:
+    """
+    Many puzzles of one grid size in a single bytearray of grid_size * grid_size bytes per
+    puzzle, for holding large sets in memory: 10 million 9x9 puzzles take 810 MB.
+    Puzzles are appended as Puzzle objects or list-of-lists grids, and indexing returns
+    Puzzle copies carrying the array's placeholder.
+    """
+
+    __slots__ = ("grid_size", "placeholder", "sub_grid_size", "data")
+
+    def __init__(self, grid_size, placeholder=0, sub_grid_size=None, puzzles=()):
+        self.grid_size = grid_size
+        self.placeholder = placeholder
+        self.sub_grid_size = sub_grid_size
+        self.data = bytearray()
+        self.extend(puzzles)
+
+    def append(self, puzzle):
+        if not isinstance(puzzle, Puzzle):
+            puzzle = Puzzle.from_rows(puzzle, self.placeholder)
+        if puzzle.grid_size != self.grid_size:
+            raise ValueError(f"Cannot add a {puzzle.grid_size}x{puzzle.grid_size} puzzle to a {self.grid_size}x{self.grid_size} array.")
+        self.data += puzzle.cells
+
+    def extend(self, puzzles):
+        for puzzle in puzzles:
+            self.append(puzzle)
+
+    def __len__(self):
+        return len(self.data) // (self.grid_size * self.grid_size)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        count = len(self)
+        if index < 0:
+            index += count
+        if not 0 <= index < count:
+            raise IndexError(f"Puzzle index {index} out of range for {count} puzzles.")
+        size = self.grid_size * self.grid_size
+        return Puzzle(self.grid_size, self.data[index * size:(index + 1) * size], self.placeholder, self.sub_grid_size)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
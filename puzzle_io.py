@@ -0,0 +1,114 @@
+# Sudoku4LLM/puzzle_io.py
+
+import json
+import os
+
+
+def count_complete_lines(file_path, truncate_partial=True):
+    """
+    Count the complete (newline-terminated) lines of a JSONL file.
+    A partially written last line, e.g. from a crash, is cut off when truncate_partial is set.
+    """
+    if not os.path.exists(file_path):
+        return 0
+
+    count = 0
+    last_newline = -1  # Offset of the last newline seen
+    offset = 0
+    with open(file_path, "rb") as file:
+        while True:
+            block = file.read(1 << 20)
+            if not block:
+                break
+            newlines = block.count(b"\n")
+            if newlines:
+                count += newlines
+                last_newline = offset + block.rindex(b"\n")
+            offset += len(block)
+
+    if truncate_partial and last_newline + 1 < offset:
+        with open(file_path, "r+b") as file:
+            file.truncate(last_newline + 1)
+    return count
+
+
+def get_output_paths(inputs, output_path, prefix=""):
+    """
+    Output file in output_path for each input file: prefix + the input's name, under the
+    input's directory relative to the directory shared by all inputs. Inputs with the same
+    name from different directories (e.g. converted/*/converted_csv_format.jsonl) thus
+    get their own output files. Raises ValueError if an input is given twice.
+    """
+    directories = [os.path.dirname(os.path.abspath(input_jsonl)) for input_jsonl in inputs]
+    common = os.path.commonpath(directories) if directories else ""
+    output_paths = [
+        os.path.normpath(os.path.join(output_path, os.path.relpath(directory, common), prefix + os.path.basename(input_jsonl)))
+        for input_jsonl, directory in zip(inputs, directories)
+    ]
+    for input_jsonl, output_jsonl in zip(inputs, output_paths):
+        if output_paths.count(output_jsonl) > 1:
+            raise ValueError(f"File '{input_jsonl}' is given more than once.")
+    return output_paths
+
+
+class JsonlPuzzleWriter:
+    """
+    Streaming JSONL writer for puzzle records.
+
+    Records are serialized as they arrive and written in buffered batches; every
+    `checkpoint_every` records the file is flushed and fsync'ed, so a crash loses at
+    most the records since the last checkpoint. With resume=True the writer appends to
+    an existing file after dropping any partial last line; `resumed_count` tells the
+    caller how many complete records were already there.
+    """
+
+    def __init__(self, file_path, resume=False, buffer_size=256, checkpoint_every=10000):
+        self.file_path = file_path
+        self.buffer_size = buffer_size
+        self.checkpoint_every = checkpoint_every
+        self.buffer = []
+        self.written = 0  # Records written by this writer
+
+        directory = os.path.dirname(file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        if resume:
+            self.resumed_count = count_complete_lines(file_path)
+            self.file = open(file_path, "a")
+        else:
+            self.resumed_count = 0
+            self.file = open(file_path, "w")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+
+    def write(self, record):
+        """Queue a record; the buffer is written out once it is full."""
+        self.buffer.append(json.dumps(record))
+        self.written += 1
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+        if self.written % self.checkpoint_every == 0:
+            self.checkpoint()
+
+    def flush(self):
+        """Write the buffered records to the file."""
+        if self.buffer:
+            self.buffer.append("")  # Terminate the last record with a newline
+            self.file.write("\n".join(self.buffer))
+            self.buffer = []
+        self.file.flush()
+
+    def checkpoint(self):
+        """Flush and fsync, making every record written so far durable."""
+        self.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        if not self.file.closed:
+            self.checkpoint()
+            self.file.close()
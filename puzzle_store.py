@@ -0,0 +1,315 @@
+# Sudoku4LLM/puzzle_store.py
+
+import argparse
+import json
+import mmap
+import os
+import struct
+
+from puzzle import Puzzle  # Compact grids
+# File layout: one fixed-size header, then fixed-size records (8-byte seed + packed cells,
+# followed by the packed solution and a 4-byte solution count when the header flags say so).
+# Settings shared by every puzzle of a file (grid size, difficulty, uniqueness,
+# placeholder) live in the header; empty cells are stored as 0.
+MAGIC = b"SDKP"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sHBBBB8s")  # magic, version, grid_size, cell_bits, difficulty, flags, placeholder
+SEED = struct.Struct("<Q")
+SOLUTION_COUNT = struct.Struct("<I")
+
+FLAG_ENFORCE_UNIQUE = 1  # Puzzles were generated with a unique solution
+FLAG_HAS_SEED = 2  # Record seeds are meaningful
+FLAG_HAS_SOLUTION = 4  # Records store the solution grid
+FLAG_HAS_SOLUTION_COUNT = 8  # Records store the (capped) solution count
+
+# Record and config fields a packed store keeps; records with any other field cannot be packed
+PACKED_RECORD_FIELDS = {"puzzle", "solution", "solution_count", "config"}
+PACKED_CONFIG_FIELDS = {"grid_size", "difficulty", "enforce_unique", "placeholder", "seed"}
+
+# Byte -> bytes of (high nibble, low nibble), used to unpack two 4-bit cells at a time
+NIBBLES = [bytes((byte >> 4, byte & 0x0F)) for byte in range(256)]
+
+
+def get_cell_bits(grid_size):
+    # 4 bits hold digits up to 15; larger grids use a whole byte per cell
+    return 4 if grid_size <= 15 else 8
+
+
+def get_grid_size_bytes(grid_size, cell_bits):
+    # Packed cells of one grid, rounded up to whole bytes
+    return (grid_size * grid_size * cell_bits + 7) // 8
+
+
+def get_record_size(grid_size, cell_bits, flags=0):
+    # Seed plus the packed cells, and the optional solution and solution count
+    grid_bytes = get_grid_size_bytes(grid_size, cell_bits)
+    size = SEED.size + grid_bytes
+    if flags & FLAG_HAS_SOLUTION:
+        size += grid_bytes
+    if flags & FLAG_HAS_SOLUTION_COUNT:
+        size += SOLUTION_COUNT.size
+    return size
+
+
+def pack_cells(puzzle, grid_size, cell_bits):
+    """
+    Pack a puzzle grid (a Puzzle or a list of lists) into bytes; anything that is not a
+    digit 1..grid_size is stored as 0.
+    """
+    if isinstance(puzzle, Puzzle):
+        cells = puzzle.cells
+    else:
+        cells = bytearray(cell if type(cell) is int and 1 <= cell <= grid_size else 0 for row in puzzle for cell in row)
+    if cell_bits == 8:
+        return bytes(cells)
+    if len(cells) % 2:
+        cells = cells + b"\x00"
+    return bytes((high << 4) | low for high, low in zip(cells[0::2], cells[1::2]))
+
+
+class PackedPuzzleWriter:
+    """
+    Write puzzles to a packed store. All puzzles of a store share the settings in its header.
+    """
+
+    def __init__(self, path, grid_size, difficulty, enforce_unique, placeholder, has_seed=True,
+                 has_solution=False, has_solution_count=False):
+        self.grid_size = grid_size
+        self.cell_bits = get_cell_bits(grid_size)
+        self.has_solution = has_solution
+        self.has_solution_count = has_solution_count
+        placeholder_bytes = str(placeholder).encode("utf-8")
+        if len(placeholder_bytes) > 8:
+            raise ValueError(f"Placeholder '{placeholder}' is too long for the packed store.")
+
+        flags = (
+            (FLAG_ENFORCE_UNIQUE if enforce_unique else 0)
+            | (FLAG_HAS_SEED if has_seed else 0)
+            | (FLAG_HAS_SOLUTION if has_solution else 0)
+            | (FLAG_HAS_SOLUTION_COUNT if has_solution_count else 0)
+        )
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(
+            MAGIC, FORMAT_VERSION, grid_size, self.cell_bits, difficulty, flags, placeholder_bytes
+        ))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+
+    def write(self, puzzle, seed=0, solution=None, solution_count=0):
+        """Append one puzzle with its seed and, if the store keeps them, its solution and solution count."""
+        self.file.write(SEED.pack(seed))
+        self.file.write(pack_cells(puzzle, self.grid_size, self.cell_bits))
+        if self.has_solution:
+            if solution is None:
+                raise ValueError("This packed store keeps solutions, but none was given.")
+            self.file.write(pack_cells(solution, self.grid_size, self.cell_bits))
+        if self.has_solution_count:
+            self.file.write(SOLUTION_COUNT.pack(solution_count))
+
+    def close(self):
+        self.file.close()
+
+
+class PackedPuzzleReader:
+    """
+    Memory-mapped reader for a packed store with O(1) access by puzzle index.
+
+    reader[i] returns the puzzle as a Puzzle carrying the store's placeholder (see
+    puzzle.py), reader[i:j] a list of them, get_puzzle(i) the list-of-lists grid and
+    get_record(i) a record shaped like a JSONL line.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, grid_size, cell_bits, difficulty, flags, placeholder = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"File '{path}' is not a packed puzzle store.")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported packed store version {version} in '{path}'.")
+
+        self.grid_size = grid_size
+        self.cell_bits = cell_bits
+        self.difficulty = difficulty
+        self.enforce_unique = bool(flags & FLAG_ENFORCE_UNIQUE)
+        self.has_seed = bool(flags & FLAG_HAS_SEED)
+        self.has_solution = bool(flags & FLAG_HAS_SOLUTION)
+        self.has_solution_count = bool(flags & FLAG_HAS_SOLUTION_COUNT)
+        self.placeholder = placeholder.rstrip(b"\x00").decode("utf-8")
+        self.grid_bytes = get_grid_size_bytes(grid_size, cell_bits)
+        self.record_size = get_record_size(grid_size, cell_bits, flags)
+        self.count = (len(self.map) - HEADER.size) // self.record_size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.get_grid(i) for i in range(*index.indices(self.count))]
+        return self.get_grid(index)
+
+    def __iter__(self):
+        for i in range(self.count):
+            yield self.get_grid(i)
+
+    def get_offset(self, index):
+        # Byte offset of record `index`, supporting negative indices
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError(f"Puzzle index {index} out of range for {self.count} puzzles.")
+        return HEADER.size + index * self.record_size
+
+    def get_grid(self, index, solution=False):
+        """Return puzzle `index`, or its solution, as a Puzzle with the store's placeholder in empty cells."""
+        offset = self.get_offset(index) + SEED.size
+        if solution:
+            if not self.has_solution:
+                raise ValueError(f"Packed store '{self.path}' does not keep solutions.")
+            offset += self.grid_bytes
+        data = self.map[offset:offset + self.grid_bytes]
+        num_cells = self.grid_size * self.grid_size
+        if self.cell_bits == 8:
+            cells = data[:num_cells]
+        else:
+            cells = b"".join(map(NIBBLES.__getitem__, data))[:num_cells]
+        return Puzzle(self.grid_size, cells, 0 if solution else self.placeholder)
+
+    def get_cells(self, index, solution=False):
+        """Return the flat list of cell values (0 for empty) of puzzle `index`, or of its solution."""
+        return list(self.get_grid(index, solution).cells)
+
+    def get_seed(self, index):
+        """Return the seed stored with puzzle `index`."""
+        return SEED.unpack_from(self.map, self.get_offset(index))[0]
+
+    def get_solution(self, index):
+        """Return the solution of puzzle `index` as a list of lists."""
+        return self.get_grid(index, solution=True).to_rows()
+
+    def get_solution_count(self, index):
+        """Return the (capped) solution count stored with puzzle `index`."""
+        if not self.has_solution_count:
+            raise ValueError(f"Packed store '{self.path}' does not keep solution counts.")
+        offset = self.get_offset(index) + self.record_size - SOLUTION_COUNT.size
+        return SOLUTION_COUNT.unpack_from(self.map, offset)[0]
+
+    def get_puzzle(self, index):
+        """Return puzzle `index` as a list of lists with the placeholder in empty cells."""
+        return self.get_grid(index).to_rows()
+
+    def get_record(self, index):
+        """Return puzzle `index` as a record shaped like a line of the generator's JSONL output."""
+        config = {
+            "grid_size": self.grid_size,
+            "difficulty": self.difficulty,
+            "enforce_unique": self.enforce_unique,
+            "placeholder": self.placeholder
+        }
+        if self.has_seed:
+            config["seed"] = self.get_seed(index)
+        record = {"puzzle": self.get_puzzle(index)}
+        if self.has_solution:
+            record["solution"] = self.get_solution(index)
+        if self.has_solution_count:
+            record["solution_count"] = self.get_solution_count(index)
+        record["config"] = config
+        return record
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+
+def jsonl_to_packed(jsonl_path, packed_path):
+    """
+    Convert a generator JSONL file into a packed store. Every record must share the
+    first record's grid size, difficulty, uniqueness and placeholder. Solutions and
+    solution counts are kept. Records with any other field, such as lists of alternative
+    solutions, grades (see difficulty_grader.py) or budget_exhausted, cannot be packed
+    and raise ValueError, so a pack/unpack round trip never loses data.
+    Returns the puzzle count.
+    """
+    writer = None
+    count = 0
+    try:
+        with open(jsonl_path, "r") as file:
+            for line in file:
+                record = json.loads(line)
+                config = record["config"]
+                settings = (config["grid_size"], config["difficulty"], config["enforce_unique"], config["placeholder"])
+                if "solutions" in record:
+                    raise ValueError(f"'{jsonl_path}' lists alternative solutions, which a packed store cannot hold.")
+                extra = sorted(record.keys() - PACKED_RECORD_FIELDS) + sorted(config.keys() - PACKED_CONFIG_FIELDS)
+                if extra:
+                    raise ValueError(
+                        f"Record {count + 1} of '{jsonl_path}' has the fields {', '.join(extra)}, "
+                        f"which a packed store cannot hold."
+                    )
+                if writer is None:
+                    first_settings = settings
+                    writer = PackedPuzzleWriter(
+                        packed_path, *settings, has_seed="seed" in config,
+                        has_solution="solution" in record, has_solution_count="solution_count" in record
+                    )
+                elif settings != first_settings:
+                    raise ValueError(
+                        f"Record {count + 1} of '{jsonl_path}' has settings {settings}, "
+                        f"but a packed store holds a single setting {first_settings}."
+                    )
+                writer.write(record["puzzle"], config.get("seed", 0), record.get("solution"), record.get("solution_count", 0))
+                count += 1
+    finally:
+        if writer is not None:
+            writer.close()
+    return count
+
+
+def packed_to_jsonl(packed_path, jsonl_path):
+    """Convert a packed store back into a generator JSONL file. Returns the puzzle count."""
+    with PackedPuzzleReader(packed_path) as reader, open(jsonl_path, "w") as file:
+        for i in range(len(reader)):
+            json.dump(reader.get_record(i), file)
+            file.write("\n")
+        return len(reader)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert between puzzle JSONL files and packed puzzle stores.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    pack_parser = subparsers.add_parser("pack", help="Convert a JSONL file into a packed store.")
+    pack_parser.add_argument("input", help="Generator JSONL file.")
+    pack_parser.add_argument("output", help="Packed store to write.")
+    unpack_parser = subparsers.add_parser("unpack", help="Convert a packed store into a JSONL file.")
+    unpack_parser.add_argument("input", help="Packed store.")
+    unpack_parser.add_argument("output", help="JSONL file to write.")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "pack":
+            count = jsonl_to_packed(args.input, args.output)
+        else:
+            count = packed_to_jsonl(args.input, args.output)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        exit(1)
+    print(f"Converted {count} puzzles from {args.input} to {args.output}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,73 @@
 # Sudoku4LLM/sudoku_generator.py
 
+import argparse
 import random
-import copy
+import hashlib
+import itertools
 import json
 import os
+import time
 from config import SudokuConfig  # Import the configuration
+from puzzle import Puzzle  # Compact grids
+from puzzle_io import JsonlPuzzleWriter  # Streaming JSONL writer
+from sudoku_solver import SudokuSolver  # Bitmask solver for small grids
+from exact_cover import ExactCoverSolver  # Iterative exact cover solver for large grids
+from difficulty_grader import DifficultyGrader  # Human-technique difficulty scores
+from dedup import INDEX_FLUSH_EVERY, CanonicalIndex  # Canonical-form digests of puzzles seen so far
+from generation_cache import DEFAULT_CACHE_MAX_MB, GenerationCache  # On-disk cache of generated puzzles
+from instrumentation import GenerationStats, InstrumentedChecker, ProgressReporter, timed_stage  # Run metrics
+
+# Optional generation features and their defaults, passed around as one options dict
+DEFAULT_GENERATION_OPTIONS = {
+    "solution_cap": 0,  # Count each puzzle's solutions up to this cap (0 = off)
+    "list_solutions": False,  # Also store the counted solutions
+    "grid_factory": False,  # Draw complete grids from BatchGridFactory
+    "grade": False,  # Store each puzzle's difficulty score and techniques in its config
+    "score_band": None,  # (min, max) difficulty score to carve puzzles to (implies grade)
+    "max_attempts": 1000,  # Complete grids tried per puzzle before giving up (0 = no limit)
+    "time_budget": 0,  # Seconds per puzzle before giving up (0 = no limit; not reproducible)
+    "dedup_index": None,  # Canonical index file; puzzles equivalent to one in it are skipped
+    "stats_output": None,  # File for the run's counters and stage timings (.prom: Prometheus text, else JSON)
+    "progress_interval": 0,  # Seconds between progress lines (0 = every 10% of the run)
+    "cache_dir": None,  # Directory of the generation cache; cached puzzles are not generated again
+    "cache_max_mb": DEFAULT_CACHE_MAX_MB,  # Cache size before the least recently used shards are evicted
+}
+# Options that change the puzzles generated for a seed, and so are part of the cache key
+CACHE_KEY_OPTIONS = ("solution_cap", "list_solutions", "grid_factory", "grade", "score_band", "max_attempts")
+GENERATOR_VERSION = 2  # Bump whenever a change alters the puzzles generated for a seed; invalidates caches
+FACTORY_BLOCK_SIZE = 1024  # Indices per BatchGridFactory block in grid_factory mode
+EXACT_COVER_MIN_GRID_SIZE = 16  # Grids this large are generated with ExactCoverSolver
+DEDUP_SEARCH_FACTOR = 10  # Puzzle indices tried per requested puzzle before deduplication gives up
+
+
+def get_solver(grid_size, sub_grid_size):
+    """
+    Pick the solver for a grid size: the bitmask solver for grids up to 12x12 and the
+    iterative exact cover solver from EXACT_COVER_MIN_GRID_SIZE on. Both offer the same
+    interface (fill_random, solve, has_unique_solution, make_uniqueness_checker).
+    """
+    if grid_size >= EXACT_COVER_MIN_GRID_SIZE:
+        return ExactCoverSolver(grid_size, sub_grid_size)
+    return SudokuSolver(grid_size, sub_grid_size)
 
 
 class SudokuGenerator:
-    def __init__(self, grid_size, sub_grid_size, placeholder, enforce_unique):
-        # Initialize an empty grid of the specified size
+    def __init__(self, grid_size, sub_grid_size, placeholder, enforce_unique, rng=None):
+        # Initialize an empty grid of the specified size. The grid is a Puzzle, so its cells
+        # are digits (0 for a removed cell) and the placeholder is only metadata.
+        # sub_grid_size is an int for square sub-grids or a (rows, columns) pair.
         self.grid_size = grid_size
         self.sub_grid_size = sub_grid_size
         self.placeholder = placeholder
         self.enforce_unique = enforce_unique
-        self.grid = [[0 for _ in range(grid_size)] for _ in range(grid_size)]
+        self.rng = rng if rng is not None else random  # Source of randomness (seedable)
+        self.grid = Puzzle(grid_size, placeholder=placeholder, sub_grid_size=sub_grid_size)
+        self.positions = [divmod(i, grid_size) for i in range(grid_size * grid_size)]  # (row, col) of every cell
+        self.solution = None  # Completed Puzzle the current puzzle was carved from
+        self.solver = get_solver(grid_size, sub_grid_size)
+        self.grader = None  # DifficultyGrader, created when puzzles are graded
+        self.budget_exhausted = False  # Whether the last puzzle missed its target within the budget
+        self.stats = None  # GenerationStats when the run is instrumented
 
         # Validate placeholder
         if self.placeholder in range(1, self.grid_size + 1):
@@ -22,116 +75,277 @@ class SudokuGenerator:
 
     def is_safe(self, row, col, num):
         # Check if the number can be placed in the given row, column, and sub-grid
-        for x in range(self.grid_size):
-            if self.grid[row][x] == num or self.grid[x][col] == num:
-                return False
-        start_row, start_col = (
-            self.sub_grid_size * (row // self.sub_grid_size),
-            self.sub_grid_size * (col // self.sub_grid_size),
-        )
-        for i in range(self.sub_grid_size):
-            for j in range(self.sub_grid_size):
-                if self.grid[start_row + i][start_col + j] == num:
-                    return False
-        return True
+        return num not in self.grid.peer_digits(row, col)
 
     def find_empty_cell(self):
         # Helper method to find the next empty cell
-        for row in range(self.grid_size):
-            for col in range(self.grid_size):
-                if self.grid[row][col] == 0:
-                    return row, col
-        return None
+        i = self.grid.cells.find(0)
+        return None if i < 0 else divmod(i, self.grid_size)
 
     def fill_grid(self):
-        # Fill the grid using backtracking
-        empty_cell = self.find_empty_cell()
-        if not empty_cell:
-            return True  # Base case: the grid is filled
-        row, col = empty_cell
-
-        nums = list(range(1, self.grid_size + 1))
-        random.shuffle(nums)
-        for num in nums:
-            if self.is_safe(row, col, num):
-                self.grid[row][col] = num
-                if self.fill_grid():
-                    return True
-                self.grid[row][col] = 0
-        return False
-
-    def remove_numbers(self, percent_missing):
+        # Fill the grid with a random complete solution from the solver
+        solution = self.solver.fill_random(self.rng)
+        self.grid = Puzzle(self.grid_size, itertools.chain.from_iterable(solution), self.placeholder, self.sub_grid_size)
+        self.solution = self.grid.copy()
+        return True
+
+    def remove_numbers(self, percent_missing, score_band=None):
+        """
+        Remove numbers from the filled grid. Returns True once the requested
+        percentage of cells has been removed, False if no further removal keeps
+        the solution unique.
+
+        With score_band = (min, max), percent_missing is the share removed before grading
+        starts. The grid is then graded once; if it is already above the band the attempt
+        stops, since removing more cells does not make a puzzle easier. Otherwise cells are
+        removed one at a time and graded after every removal until the score lies in the
+        band; a removal that pushes the score above the band is undone and the next cell is
+        tried. The attempt ends once the grid is minimal and still below the band. Returns
+        False if the band was missed, leaving the closest grid found.
+        """
         # Calculate the number of cells to remove based on the percentage of missing numbers
         total_cells = self.grid_size * self.grid_size
         cells_to_remove = int(total_cells * percent_missing / 100)
-
+        checker = self.solver.make_uniqueness_checker(self.grid) if self.enforce_unique else None
+        if checker is not None and self.stats is not None:
+            checker = InstrumentedChecker(checker, self.stats)
+
+        # Visit the filled cells once in random order. A removal rejected for uniqueness
+        # never becomes acceptable later (removing more cells only adds solutions), so
+        # rejected cells are kept for good instead of being drawn again: the cells not
+        # visited yet are the only ones that may still be removable.
+        cells = list(itertools.compress(self.positions, self.grid.cells))
+        self.rng.shuffle(cells)
+        position = 0
         while cells_to_remove > 0:
-            row, col = random.randint(0, self.grid_size - 1), random.randint(0, self.grid_size - 1)
-            if self.grid[row][col] != 0:
-                backup = self.grid[row][col]
-                self.grid[row][col] = self.placeholder
-
-                # If enforcing unique solutions, check for uniqueness
-                if self.enforce_unique and not self.has_unique_solution(self.grid):
-                    self.grid[row][col] = backup
-                else:
-                    cells_to_remove -= 1
+            if cells_to_remove > len(cells) - position:
+                return False  # Too few removable cells left to reach the target
+            row, col = cells[position]
+            position += 1
+            if checker is None or checker.try_remove(row, col):
+                self.grid[row, col] = 0
+                cells_to_remove -= 1
+        if score_band is None:
+            return True
+
+        score = self.grade()["difficulty_score"]
+        if score > score_band[1]:
+            return False  # Already too hard
+        for row, col in cells[position:]:
+            if score >= score_band[0]:
+                return True
+            if checker is not None and not checker.try_remove(row, col):
+                continue
+            digit = self.grid[row, col]
+            self.grid[row, col] = 0
+            removed_score = self.grade()["difficulty_score"]
+            if removed_score > score_band[1]:
+                # Too hard: put the digit back and try the next cell
+                self.grid[row, col] = digit
+                if checker is not None:
+                    checker.restore(row, col)
+            else:
+                score = removed_score
+        return score >= score_band[0]  # False once the grid is minimal and still too easy
 
     def has_unique_solution(self, grid):
         """
         Check if the given Sudoku grid has a unique solution.
         """
-        solutions = 0
-
-        def solve():
-            nonlocal solutions
-            empty_cell = self.find_empty_cell()
-            if not empty_cell:
-                solutions += 1
-                return
-            row, col = empty_cell
-            for num in range(1, self.grid_size + 1):
-                if self.is_safe(row, col, num):
-                    grid[row][col] = num
-                    solve()
-                    grid[row][col] = 0
-                    if solutions > 1:  # Stop early if more than one solution is found
-                        return
-
-        solve()
-        return solutions == 1
-    
-    def generate_puzzle(self, percent_missing):
-        # Generate a complete grid and then remove numbers to create a puzzle
-        self.grid = [[0 for _ in range(self.grid_size)] for _ in range(self.grid_size)]
-        self.fill_grid()
-        self.remove_numbers(percent_missing)
-        return self.grid  # Return the puzzle
-
-
-def save_puzzles_to_jsonl(puzzles, path, filename, config, settings):
+        return self.solver.has_unique_solution(grid)
+
+    def grade(self):
+        """Grade the current puzzle with the DifficultyGrader (see difficulty_grader.py)."""
+        if self.grader is None:
+            self.grader = DifficultyGrader(self.grid_size, self.sub_grid_size)
+        with self.stage("grade"):
+            return self.grader.grade(self.grid)
+
+    def stage(self, name):
+        # Time a block as a stage of the instrumented run; does nothing otherwise
+        return timed_stage(self.stats, name)
+
+    def to_output_grid(self):
+        # Copy of the internal grid; its placeholder fills the removed cells in to_rows()
+        return self.grid.copy()
+
+    def get_solution_info(self, solution_cap=0, list_solutions=False):
+        """
+        Describe the solutions of the current puzzle: the grid it was carved from and,
+        when solution_cap is set, the number of solutions (capped at solution_cap, so
+        solution_cap means "at least that many") and optionally the solutions themselves.
+        """
+        info = {"solution": self.solution.to_rows()}
+        if solution_cap > 0:
+            if self.enforce_unique:
+                solutions = [info["solution"]]  # Known to be the only one
+            else:
+                solutions = self.solver.solve(self.grid, limit=solution_cap)
+            info["solution_count"] = len(solutions)
+            if list_solutions:
+                info["solutions"] = solutions
+        return info
+
+    def generate_puzzle(self, percent_missing, seed=None, solution=None, score_band=None, max_attempts=0,
+                        time_budget=0):
+        """
+        Generate a complete grid (or start from the given complete solution) and then
+        remove numbers to create a puzzle, optionally until its score is in score_band.
+        If the grid becomes minimal before enough cells are removed, start over with a new
+        grid. After max_attempts grids or time_budget seconds (0 = no limit), give up and
+        return the closest attempt (most cells removed, or the score nearest to the band,
+        preferring scores below it to scores above it); budget_exhausted is then set.
+        """
+        if seed is not None:
+            self.rng = random.Random(seed)  # Reproducible puzzle for this seed
+        deadline = time.monotonic() + time_budget if time_budget else None
+        self.budget_exhausted = False
+        best = None  # (distance, grid, solution) of the closest failed attempt
+        attempts = 0
+        while True:
+            attempts += 1
+            if solution is not None:
+                self.grid = Puzzle.from_rows(solution, self.placeholder, self.sub_grid_size)
+                self.solution = self.grid.copy()
+                solution = None  # A given solution is only tried once
+            else:
+                with self.stage("fill"):
+                    self.fill_grid()
+            if self.stats is not None:
+                self.stats.count("grids_tried")
+            with self.stage("remove"):
+                removed = self.remove_numbers(percent_missing, score_band)
+            if removed:
+                return self.to_output_grid()  # Return the puzzle
+
+            if score_band is not None:
+                score = self.grade()["difficulty_score"]
+                # Any grid below the band ranks before every grid above it
+                distance = (0, score_band[0] - score) if score < score_band[0] else (1, score - score_band[1])
+            else:
+                distance = -self.grid.empty_count()
+            if best is None or distance < best[0]:
+                best = (distance, self.grid, self.solution)
+            if (max_attempts and attempts >= max_attempts) or (deadline is not None and time.monotonic() >= deadline):
+                _, self.grid, self.solution = best
+                self.budget_exhausted = True
+                return self.to_output_grid()
+
+
+def derive_puzzle_seed(master_seed, index):
     """
-    Save puzzles to a JSONL file, excluding unnecessary internal details like sub_grid_size.
+    Derive the seed of puzzle `index` from the master seed. The derivation only
+    depends on the two numbers, so a puzzle is the same whichever worker builds it.
     """
-    # Ensure the directory exists
-    os.makedirs(path, exist_ok=True)
-    file_path = os.path.join(path, filename)
+    digest = hashlib.sha256(f"{master_seed}:{index}".encode("ascii")).digest()
+    return int.from_bytes(digest[:8], "big")
+
+
+def get_generation_options(options):
+    """
+    Fill in the defaults of the optional generation features, rejecting unknown ones.
+    """
+    unknown = set(options) - set(DEFAULT_GENERATION_OPTIONS)
+    if unknown:
+        raise ValueError(f"Unknown generation options: {', '.join(sorted(unknown))}.")
+    return {**DEFAULT_GENERATION_OPTIONS, **options}
+
+
+def get_factory_grids(grid_size, sub_grid_size, master_seed, start, stop):
+    """
+    Draw the complete grids for puzzles [start, stop) from BatchGridFactory. Grids come
+    in fixed blocks of FACTORY_BLOCK_SIZE indices, each seeded from the master seed and
+    the block, so a puzzle's grid never depends on how the indices were chunked.
+    """
+    from batch_grid_factory import BatchGridFactory  # Needs NumPy, so only imported on use
+
+    grids = []
+    first_block = start - start % FACTORY_BLOCK_SIZE
+    for block in range(first_block, stop, FACTORY_BLOCK_SIZE):
+        factory = BatchGridFactory(grid_size, sub_grid_size, seed=derive_puzzle_seed(f"{master_seed}:grids", block))
+        block_grids = factory.generate(FACTORY_BLOCK_SIZE).tolist()
+        grids.extend(block_grids[max(start - block, 0):stop - block])
+    return grids
 
-    # Extract settings for easier readability
-    percent_missing, enforce_unique, placeholder = settings
 
-    with open(file_path, "w") as file:
-        for puzzle in puzzles:
-            json.dump({
-                "puzzle": puzzle,
-                "config": {
-                    "grid_size": config["grid_size"],  # Retain grid size
-                    "difficulty": percent_missing,     # Retain difficulty as percentage
-                    "enforce_unique": enforce_unique,  # Retain uniqueness enforcement
-                    "placeholder": placeholder         # Retain placeholder
-                }
-            }, file)
-            file.write("\n")
+def generate_puzzle_chunk(task):
+    """
+    Generate the puzzles with indices [start, stop). Runs inside pool workers,
+    so it only takes picklable arguments. Returns (results, stats): results holds
+    (seed, puzzle, solution info, config fields) tuples, whose config fields (grade,
+    budget flag) are added to the record's config, and stats is the chunk's
+    GenerationStats.as_dict() when the run is instrumented, None otherwise.
+    """
+    grid_size, sub_grid_size, settings, master_seed, start, stop, options = task
+    percent_missing, enforce_unique, placeholder = settings
+    generator = SudokuGenerator(grid_size, sub_grid_size, placeholder, enforce_unique)
+    if options["stats_output"]:
+        generator.stats = GenerationStats()
+    if options["grid_factory"]:
+        with generator.stage("fill"):
+            solutions = get_factory_grids(grid_size, sub_grid_size, master_seed, start, stop)
+    else:
+        solutions = [None] * (stop - start)
+
+    results = []
+    for index, solution in zip(range(start, stop), solutions):
+        seed = derive_puzzle_seed(master_seed, index)
+        puzzle = generator.generate_puzzle(
+            percent_missing, seed=seed, solution=solution, score_band=options["score_band"],
+            max_attempts=options["max_attempts"], time_budget=options["time_budget"]
+        )
+        with generator.stage("solutions"):
+            solution_info = generator.get_solution_info(options["solution_cap"], options["list_solutions"])
+        config_fields = {}
+        if options["grade"] or options["score_band"]:
+            config_fields.update(generator.grade())
+        if generator.budget_exhausted:
+            config_fields["budget_exhausted"] = True  # Closest attempt, short of the target
+        results.append((seed, puzzle, solution_info, config_fields))
+
+    stats = generator.stats
+    if stats is not None:
+        stats.count("puzzles", len(results))
+        stats.count("budget_exhausted", sum(1 for result in results if result[3].get("budget_exhausted")))
+        stats.count("search_nodes", generator.solver.search_nodes)
+        stats.count("backtracks", generator.solver.backtracks)
+        stats = stats.as_dict()
+    return results, stats
+
+
+def make_puzzle_record(puzzle, config, settings, seed=None, solution_info=None, config_fields=None):
+    """
+    Build the JSONL record of one puzzle, excluding unnecessary internal details like sub_grid_size.
+    solution_info (see SudokuGenerator.get_solution_info) adds the solution fields and
+    config_fields further config entries, such as the grade (see DifficultyGrader.grade).
+    """
+    percent_missing, enforce_unique, placeholder = settings
+    puzzle_config = {
+        "grid_size": config["grid_size"],  # Retain grid size
+        "difficulty": percent_missing,     # Retain difficulty as percentage
+        "enforce_unique": enforce_unique,  # Retain uniqueness enforcement
+        "placeholder": placeholder         # Retain placeholder
+    }
+    if seed is not None:
+        puzzle_config["seed"] = seed  # Retain per-puzzle seed for reproducibility
+    if config_fields:
+        puzzle_config.update(config_fields)  # E.g. difficulty score, techniques and solving steps
+    record = {"puzzle": puzzle.to_rows() if isinstance(puzzle, Puzzle) else puzzle}
+    if solution_info is not None:
+        record.update(solution_info)  # Solution, and optionally solution_count / solutions
+    record["config"] = puzzle_config
+    return record
+
+
+def save_puzzles_to_jsonl(puzzles, path, filename, config, settings, seeds=None):
+    """
+    Save puzzles to a JSONL file, excluding unnecessary internal details like sub_grid_size.
+    When seeds are given, each puzzle's seed is stored in its config for reproducibility.
+    """
+    file_path = os.path.join(path, filename)
+    with JsonlPuzzleWriter(file_path) as writer:
+        for i, puzzle in enumerate(puzzles):
+            writer.write(make_puzzle_record(puzzle, config, settings, seeds[i] if seeds is not None else None))
     print(f"Puzzles saved to {file_path} in JSON Lines format.")
 
 
@@ -204,7 +418,7 @@ def get_user_settings(config):
 
 def select_grid_size(configs):
     """
-    Allow the user to select a grid size (4x4, 6x6, 9x9).
+    Allow the user to select a grid size (4x4, 6x6, 8x8, 9x9, 12x12).
     """
     print("\nSelect Sudoku grid size:\n")
     grid_options = list(configs.keys())
@@ -214,7 +428,7 @@ def select_grid_size(configs):
 
     while True:
         try:
-            choice = int(input("Enter your choice (1, 2, or 3): ").strip())
+            choice = int(input(f"Enter your choice (1-{len(grid_options)}): ").strip())
             if 1 <= choice <= len(grid_options):
                 selected_version = grid_options[choice - 1]
                 print(f"\nYou've selected '{selected_version}' Sudoku.\n")
@@ -225,42 +439,398 @@ def select_grid_size(configs):
             print("\nInvalid input. Please enter a number corresponding to your choice.\n")
 
 
-def generate_sudoku_puzzles(num_puzzles, config, settings, output_file):
+def iter_sudoku_puzzles(num_puzzles, config, settings, seed, workers=1, start=0, options=None, stats=None):
     """
-    Generate a batch of Sudoku puzzles using predefined settings.
+    Lazily generate puzzles start..num_puzzles-1, yielding (seed, puzzle, solution info, config fields)
+    tuples in index order. options holds the optional features (see DEFAULT_GENERATION_OPTIONS).
+    With the stats_output option, the workers' counters and timings are merged into stats.
+
+    Puzzle i is generated from derive_puzzle_seed(seed, i), so for a given master
+    seed the sequence is identical whatever the number of worker processes.
     """
-    percent_missing, enforce_unique, placeholder = settings
-    generator = SudokuGenerator(
-        config["grid_size"], config["sub_grid_size"], placeholder, enforce_unique
+    options = get_generation_options(options or {})
+    # Split the indices into chunks; several chunks per worker keep the pool balanced.
+    # In grid_factory mode chunks follow the factory blocks so no block is built twice.
+    if options["grid_factory"]:
+        chunk_size = FACTORY_BLOCK_SIZE
+    else:
+        chunk_size = max(1, min(1000, -(-(num_puzzles - start) // (workers * 4))))
+    bounds = [start] + list(range(start - start % chunk_size + chunk_size, num_puzzles, chunk_size)) + [num_puzzles]
+    tasks = (
+        (config["grid_size"], config["sub_grid_size"], settings, seed, first, stop, options)
+        for first, stop in zip(bounds, bounds[1:])
+        if first < stop
     )
 
-    puzzles = []
-    for i in range(num_puzzles):
-        print(f"Generating puzzle {i + 1}/{num_puzzles}...")
-        puzzle = generator.generate_puzzle(percent_missing)
-        puzzles.append(puzzle)
+    # Chunks arrive in index order, so the output order never depends on the workers
+    if workers > 1:
+        import multiprocessing  # Only needed with several workers
+
+        pool = multiprocessing.Pool(workers)
+        chunks = pool.imap(generate_puzzle_chunk, tasks)
+    else:
+        pool = None
+        chunks = map(generate_puzzle_chunk, tasks)
+    try:
+        for results, chunk_stats in chunks:
+            if stats is not None and chunk_stats is not None:
+                stats.merge(chunk_stats)
+            yield from results
+    finally:
+        if pool is not None:
+            pool.terminate()
+
+
+def get_cache_key(config, settings, seed, options):
+    """Everything that determines the puzzles of a run, as the key of its generation cache entry."""
+    percent_missing, enforce_unique, placeholder = settings
+    key = {
+        "generator_version": GENERATOR_VERSION,
+        "grid_size": config["grid_size"],
+        "sub_grid_size": config["sub_grid_size"],
+        "difficulty": percent_missing,
+        "enforce_unique": enforce_unique,
+        "placeholder": placeholder,
+        "seed": seed,
+    }
+    key.update((option, options[option]) for option in CACHE_KEY_OPTIONS)
+    return key
+
+
+def generate_sudoku_puzzles(num_puzzles, config, settings, output_file, workers=1, seed=None, resume=False,
+                            **options):
+    """
+    Generate a batch of Sudoku puzzles using predefined settings.
 
-    # Pass config and settings to save_puzzles_to_jsonl
-    save_puzzles_to_jsonl(puzzles, config["base_output_path"], output_file, config, settings)
+    Every record stores the solution the puzzle was carved from. Optional features
+    are passed as keyword options, see DEFAULT_GENERATION_OPTIONS.
 
+    Puzzles are streamed to the JSONL file as they are produced, so memory stays
+    bounded and an interrupted run can be continued with resume=True and the same seed.
+
+    With the dedup_index option, every puzzle is checked against a persistent
+    CanonicalIndex and skipped if it is equivalent to one already in it; puzzles from
+    the following indices take the place of the skipped ones, up to
+    num_puzzles * DEDUP_SEARCH_FACTOR indices in total.
+
+    With the stats_output option, the run's counters (search nodes, backtracks,
+    uniqueness checks, rejected removals, ...) and time per stage (fill, remove,
+    uniqueness, serialize, ...) are written to that file at the end, see GenerationStats.
+
+    With the cache_dir option, puzzles are looked up in a GenerationCache under
+    get_cache_key first, and only the missing indices are generated and added to it.
+    The output is the same as without the cache. Runs without a seed or with a time
+    budget are not cached.
+    """
+    options = get_generation_options(options)
+    cache = None
+    if options["cache_dir"]:
+        if seed is None:
+            print("Warning: runs without a master seed are not cached; pass a seed to reuse their puzzles.")
+        elif options["time_budget"]:
+            print("Warning: runs with a time budget are not cached; their puzzles depend on machine speed.")
+        else:
+            cache = GenerationCache(options["cache_dir"], options["cache_max_mb"] * 1024 * 1024)
+            cache_entry = cache.entry(get_cache_key(config, settings, seed, options))
+    if seed is None:
+        if resume:
+            raise ValueError("Resuming a run requires the master seed of the original run.")
+        seed = random.randrange(2 ** 63)
+        print(f"Using master seed {seed} (pass --seed {seed} to reproduce this run).")
+
+    file_path = os.path.join(config["base_output_path"], output_file)
+
+    def generate_range(first, last):
+        # Puzzles first..last-1 in index order
+        return iter_sudoku_puzzles(last, config, settings, seed, workers, first, options, stats)
+
+    # The index file is only appended to after the writer's checkpoints (see below), so it
+    # never holds digests of puzzles that a crash kept from reaching the output file
+    index = CanonicalIndex(options["dedup_index"], flush_every=None) if options["dedup_index"] else None
+    stats = None
+    if options["stats_output"]:
+        percent_missing, enforce_unique, placeholder = settings
+        stats = GenerationStats({
+            "grid_size": config["grid_size"], "difficulty": percent_missing,
+            "enforce_unique": "unique" if enforce_unique else "non_unique",
+        })
+    with JsonlPuzzleWriter(file_path, resume=resume) as writer:
+        start = min(writer.resumed_count, num_puzzles)
+        if start:
+            print(f"Resuming after {start} puzzles already in {file_path}.")
+            if index is not None:
+                # Puzzles written before the interruption may not have reached the index file
+                with open(file_path, "r") as file:
+                    for line in file:
+                        index.add_puzzle(json.loads(line)["puzzle"], config["grid_size"])
+
+        progress = ProgressReporter(num_puzzles, start, options["progress_interval"])
+        done = start
+        dropped = 0
+        next_index = start
+        last_index = num_puzzles if index is None else num_puzzles * DEDUP_SEARCH_FACTOR
+        # Without deduplication this loop runs once; skipped duplicates are replaced from
+        # the indices after the last one tried, so a resumed run skips the same ones again
+        while done < num_puzzles and next_index < last_index:
+            stop = min(last_index, next_index + num_puzzles - done)
+            if cache is None:
+                puzzles = generate_range(next_index, stop)
+            else:
+                puzzles = cache.iter_puzzles(cache_entry, next_index, stop, generate_range, stats)
+            for puzzle_seed, puzzle, solution_info, config_fields in puzzles:
+                next_index += 1
+                if index is not None:
+                    with timed_stage(stats, "dedup"):
+                        new = index.add_puzzle(puzzle, config["grid_size"])
+                    if not new:
+                        dropped += 1
+                        continue
+                with timed_stage(stats, "serialize"):
+                    writer.write(make_puzzle_record(puzzle, config, settings, puzzle_seed, solution_info, config_fields))
+                if index is not None and len(index.pending) >= INDEX_FLUSH_EVERY:
+                    writer.checkpoint()
+                    index.flush()
+                done += 1
+                progress.update(done)
+
+    if cache is not None:
+        print(f"Read {cache.hits} puzzles from the cache in {options['cache_dir']} and generated {cache.misses}.")
+        cache.evict()
+    if index is not None:
+        index.close()
+        print(f"Skipped {dropped} duplicate puzzles; the index now holds {len(index)} puzzles.")
+        if done < num_puzzles:
+            print(f"Warning: only {done} of {num_puzzles} puzzles were new within {last_index} tries.")
+    if stats is not None:
+        stats.count("duplicates_skipped", dropped)
+        stats.save(options["stats_output"])
+        print(f"Run statistics saved to {options['stats_output']}.")
+    print(f"Puzzles saved to {file_path} in JSON Lines format.")
+    return file_path
+
+
+def get_output_filename(config, settings, score_band=None):
+    """
+    Build the detailed output filename for a grid config and (difficulty, enforce_unique, placeholder) settings,
+    marking the score band when puzzles are carved to one.
+    """
+    difficulty, enforce_unique, placeholder = settings
+    enforce_label = "unique" if enforce_unique else "non_unique"
+    band_label = f"_score-{score_band[0]}-{score_band[1]}" if score_band else ""
+    return f"grid-{config['grid_size']}_diff-{difficulty}_placeholder-{placeholder}_enforce-{enforce_label}{band_label}.jsonl"
+
+
+def as_list(value):
+    # Allow single settings and lists of settings alike
+    return list(value) if isinstance(value, (list, tuple)) else [value]
+
+
+def resolve_settings(config, difficulty, unique, placeholder):
+    """
+    Expand difficulty, uniqueness and placeholder choices for one grid config into
+    (percent_missing, enforce_unique, placeholder) tuples. Each choice may be a single
+    value, a list, "all", or None for the config default.
+    """
+    defaults = config["default_options"]
+
+    percents = []
+    for level in as_list(defaults["difficulty"] if difficulty is None else difficulty):
+        if level == "all":
+            percents.extend(config["difficulty_levels"].values())
+        elif isinstance(level, int) and not isinstance(level, bool):
+            if not 0 <= level <= 100:
+                raise ValueError(f"Invalid difficulty {level}; a percentage of missing numbers must be between 0 and 100.")
+            percents.append(level)  # Raw percentage of missing numbers
+        elif level in config["difficulty_levels"]:
+            percents.append(config["difficulty_levels"][level])
+        else:
+            raise ValueError(
+                f"Invalid difficulty '{level}' for {config['grid_size']}x{config['grid_size']}; "
+                f"choose from {', '.join(config['difficulty_levels'])}."
+            )
+
+    enforce_options = []
+    for option in as_list(defaults["enforce_unique"] if unique is None else unique):
+        if option == "all":
+            enforce_options.extend(config["enforce_unique_options"].values())
+        elif isinstance(option, bool):
+            enforce_options.append(option)
+        elif option in config["enforce_unique_options"]:
+            enforce_options.append(config["enforce_unique_options"][option])
+        else:
+            raise ValueError(f"Invalid uniqueness option '{option}'; choose 'unique' or 'non_unique'.")
+
+    placeholders = []
+    for choice in as_list(defaults["placeholder"] if placeholder is None else placeholder):
+        if choice == "all":
+            placeholders.extend(SudokuConfig.get_placeholder_options())
+        elif choice in SudokuConfig.get_placeholder_options():
+            placeholders.append(choice)
+        else:
+            raise ValueError(f"Invalid placeholder '{choice}'; choose from {', '.join(SudokuConfig.get_placeholder_options())}.")
+
+    return list(itertools.product(percents, enforce_options, placeholders))
+
+
+def generate(grid="9x9", difficulty=None, unique=None, placeholder=None, n=None, seed=None,
+             workers=1, resume=False, output_path=None, **options):
+    """
+    Generate puzzle files without any prompts and return the paths written.
+
+    Every setting accepts a single value or a list, and grid, difficulty, unique and
+    placeholder also accept "all", so one call can sweep the whole
+    grid x difficulty x uniqueness x placeholder matrix. Grids are given as "9x9" or 9,
+    difficulties as level names or raw percentages, uniqueness as "unique"/"non_unique"
+    or a bool. None means the grid's default option; n defaults to its num_puzzles.
+    Keyword options (see DEFAULT_GENERATION_OPTIONS) are passed on to generate_sudoku_puzzles.
+    When several files are generated, each run's stats_output file gets the output file's
+    name appended, e.g. stats_grid-9_diff-60_placeholder-0_enforce-unique.json.
+    """
+    configs = SudokuConfig.get_configs()
+    grids = list(configs) if "all" in as_list(grid) else as_list(grid)
+
+    runs = []
+    for grid_choice in grids:
+        key = f"{grid_choice}x{grid_choice}" if isinstance(grid_choice, int) else grid_choice
+        if key not in configs:
+            raise ValueError(f"Invalid grid size '{grid_choice}'; choose from {', '.join(configs)}.")
+        config = dict(configs[key])
+        if output_path is not None:
+            config["base_output_path"] = output_path
+
+        num_puzzles = config["num_puzzles"] if n is None else n
+        for settings in resolve_settings(config, difficulty, unique, placeholder):
+            runs.append((num_puzzles, config, settings, get_output_filename(config, settings, options.get("score_band"))))
+
+    paths = []
+    for num_puzzles, config, settings, output_file in runs:
+        run_options = dict(options)
+        if options.get("stats_output") and len(runs) > 1:
+            root, extension = os.path.splitext(options["stats_output"])
+            run_options["stats_output"] = f"{root}_{os.path.splitext(output_file)[0]}{extension}"
+        paths.append(generate_sudoku_puzzles(
+            num_puzzles, config, settings, output_file,
+            workers, seed, resume,
+            **run_options
+        ))
+    return paths
+
+
+def parse_args(argv=None):
+    """
+    Parse command-line options for the generator.
+    """
+    parser = argparse.ArgumentParser(
+        description="Generate Sudoku puzzles in JSON Lines format. "
+                    "Without --grid, the remaining settings are asked for interactively."
+    )
+    parser.add_argument("--grid", nargs="+",
+                        help="Grid sizes to generate, e.g. 4x4 9x9, or 'all'.")
+    parser.add_argument("--difficulty", nargs="+",
+                        help="Difficulty levels (e.g. easy hard) or 'all' (default: grid default).")
+    parser.add_argument("--unique", nargs="+", choices=["unique", "non_unique", "all"],
+                        help="Solution uniqueness options (default: grid default).")
+    parser.add_argument("--placeholder", nargs="+",
+                        help="Placeholders for missing numbers, e.g. 0 ? or 'all' (default: grid default).")
+    parser.add_argument("-n", "--num-puzzles", type=int, default=None,
+                        help="Puzzles per settings combination (default: num_puzzles from config.py).")
+    parser.add_argument("--output-path", default=None,
+                        help="Directory for the JSONL files (default: base_output_path from config.py).")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of worker processes used to generate puzzles (default: 1).")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Master seed; the same seed always produces the same puzzles.")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue an interrupted run (same --seed) after the last complete line.")
+    parser.add_argument("--solution-cap", type=int, default=0,
+                        help="Count each puzzle's solutions up to this cap and store solution_count (default: off).")
+    parser.add_argument("--list-solutions", action="store_true",
+                        help="Also store the (at most --solution-cap) solutions of each puzzle.")
+    parser.add_argument("--grid-factory", action="store_true",
+                        help="Draw complete grids from the NumPy BatchGridFactory instead of the solver.")
+    parser.add_argument("--grade", action="store_true",
+                        help="Store each puzzle's difficulty score, techniques and steps in its config.")
+    parser.add_argument("--score-band", nargs=2, type=int, metavar=("MIN", "MAX"), default=None,
+                        help="Carve each puzzle until its difficulty score is between MIN and MAX (implies --grade).")
+    parser.add_argument("--max-attempts", type=int, default=DEFAULT_GENERATION_OPTIONS["max_attempts"],
+                        help="Complete grids tried per puzzle before settling for the closest attempt "
+                             "(default: %(default)s; 0 = no limit).")
+    parser.add_argument("--time-budget", type=float, default=0,
+                        help="Seconds per puzzle before settling for the closest attempt (default: no limit). "
+                             "Makes output depend on machine speed.")
+    parser.add_argument("--dedup-index", default=None, metavar="PATH",
+                        help="Canonical index file shared across runs; puzzles equivalent to one already "
+                             "in it (up to symmetry and relabeling) are skipped and replaced.")
+    parser.add_argument("--stats-output", default=None, metavar="PATH",
+                        help="Write counters and time per stage to PATH at the end of the run "
+                             "(Prometheus text for .prom or .txt files, JSON otherwise).")
+    parser.add_argument("--cache-dir", default=None, metavar="PATH",
+                        help="Generation cache directory; puzzles generated before with the same settings "
+                             "and seed are read from it instead of being generated again.")
+    parser.add_argument("--cache-max-mb", type=float, default=DEFAULT_CACHE_MAX_MB,
+                        help="Cache size in MiB before the least recently used shards are evicted "
+                             "(default: %(default)s).")
+    parser.add_argument("--progress-interval", type=float, default=0, metavar="SECONDS",
+                        help="Print progress with rate and ETA every SECONDS (default: every 10%% of the run).")
+    args = parser.parse_args(argv)
+    if args.list_solutions and args.solution_cap < 1:
+        parser.error("--list-solutions needs --solution-cap.")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1.")
+    if args.max_attempts < 0 or args.time_budget < 0:
+        parser.error("--max-attempts and --time-budget must not be negative.")
+    if args.progress_interval < 0:
+        parser.error("--progress-interval must not be negative.")
+    if args.cache_max_mb < 0:
+        parser.error("--cache-max-mb must not be negative.")
+    if args.score_band is not None:
+        if args.score_band[0] > args.score_band[1]:
+            parser.error("--score-band MIN must not be larger than MAX.")
+        args.score_band = tuple(args.score_band)
+    if args.difficulty is not None:
+        args.difficulty = [int(level) if level.isdigit() else level for level in args.difficulty]
+    return args
+
+
+def get_cli_options(args):
+    # Generation options set on the command line
+    return {option: getattr(args, option) for option in DEFAULT_GENERATION_OPTIONS}
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.grid is not None:
+        # Non-interactive mode: every setting comes from the command line or the config defaults
+        try:
+            generate(args.grid, args.difficulty, args.unique, args.placeholder, args.num_puzzles,
+                     args.seed, args.workers, args.resume, args.output_path, **get_cli_options(args))
+        except ValueError as e:
+            print(f"Error: {e}")
+            exit(1)
+        return
 
-if __name__ == "__main__":
     # Load configurations
     configs = SudokuConfig.get_configs()
 
     # Let the user select the grid size
-    selected_config = select_grid_size(configs)
+    selected_config = dict(select_grid_size(configs))
+    if args.output_path is not None:
+        selected_config["base_output_path"] = args.output_path
 
     # Collect user settings
     settings = get_user_settings(selected_config)
-    num_puzzles = selected_config["num_puzzles"]
+    num_puzzles = selected_config["num_puzzles"] if args.num_puzzles is None else args.num_puzzles
 
     # Create a detailed output filename
-    difficulty, enforce_unique, placeholder = settings
-    enforce_label = "unique" if enforce_unique else "non_unique"
-    output_file = (
-        f"grid-{selected_config['grid_size']}_diff-{difficulty}_placeholder-{placeholder}_enforce-{enforce_label}.jsonl"
-    )
+    output_file = get_output_filename(selected_config, settings, args.score_band)
 
     # Generate puzzles
-    generate_sudoku_puzzles(num_puzzles, selected_config, settings, output_file)
\ No newline at end of file
+    generate_sudoku_puzzles(
+        num_puzzles, selected_config, settings, output_file, args.workers, args.seed, args.resume,
+        **get_cli_options(args)
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+# Sudoku4LLM/sudoku_solver.py
+
+import itertools
+import random
+
+from geometry import get_geometry  # Shared index tables per grid geometry
+from puzzle import Puzzle  # Compact grids
+
+
+class SudokuSolver:
+    """
+    Bitmask constraint-propagation solver shared by puzzle generation and uniqueness checks.
+
+    Every row, column and sub-grid keeps a bitmask of the digits already placed in it
+    (bit d - 1 stands for digit d), so the candidates of a cell are a single OR/NOT away.
+    The search always branches on the most constrained cell (MRV) after propagating
+    naked and hidden singles.
+    """
+
+    def __init__(self, grid_size, sub_grid_size):
+        # sub_grid_size is an int for square sub-grids or a (rows, columns) pair
+        self.geometry = get_geometry(grid_size, sub_grid_size)
+        self.grid_size = grid_size
+        self.sub_grid_size = sub_grid_size
+        self.num_cells = grid_size * grid_size
+        self.full_mask = (1 << grid_size) - 1
+        self.num_boxes = grid_size
+
+        # Shared row, column and sub-grid index of every cell; every unit takes part
+        # in hidden-single propagation
+        self.cell_row = self.geometry.cell_row
+        self.cell_col = self.geometry.cell_col
+        self.cell_box = self.geometry.cell_box
+        self.units = self.geometry.units
+        self.search_nodes = 0  # Search calls so far, for instrumentation
+        self.backtracks = 0  # Searches that ran into a contradiction
+
+    def load(self, grid):
+        """
+        Build the solver state from a grid (a Puzzle or a list of lists). Any cell that is
+        not a digit 1..grid_size (0, placeholder strings, ...) is treated as empty.
+        Returns None if the givens clash.
+        """
+        values = [0] * self.num_cells
+        rows = [0] * self.grid_size
+        cols = [0] * self.grid_size
+        boxes = [0] * self.num_boxes
+        state = (values, rows, cols, boxes)
+
+        cells = grid.cells if isinstance(grid, Puzzle) else itertools.chain.from_iterable(grid)
+        for i, cell in enumerate(cells):
+            if type(cell) is not int or not 1 <= cell <= self.grid_size:
+                continue
+            bit = 1 << (cell - 1)
+            if (rows[self.cell_row[i]] | cols[self.cell_col[i]] | boxes[self.cell_box[i]]) & bit:
+                return None
+            self.place(state, i, bit)
+        return state
+
+    def place(self, state, i, bit):
+        # Put the digit encoded by bit into cell i and mark it used in the cell's units
+        values, rows, cols, boxes = state
+        values[i] = bit
+        rows[self.cell_row[i]] |= bit
+        cols[self.cell_col[i]] |= bit
+        boxes[self.cell_box[i]] |= bit
+
+    def candidates(self, state, i):
+        # Bitmask of the digits that can still go into cell i
+        values, rows, cols, boxes = state
+        return self.full_mask & ~(rows[self.cell_row[i]] | cols[self.cell_col[i]] | boxes[self.cell_box[i]])
+
+    def propagate(self, state):
+        """
+        Apply naked and hidden singles until nothing changes.
+        Returns -1 if the grid is solved, None on a contradiction, and otherwise
+        the index of the empty cell with the fewest candidates.
+        """
+        values, rows, cols, boxes = state
+        cell_row, cell_col, cell_box = self.cell_row, self.cell_col, self.cell_box
+        full = self.full_mask
+
+        while True:
+            progress = False
+            best_cell, best_count = -1, self.grid_size + 1
+
+            # Naked singles: a cell with exactly one candidate
+            for i in range(self.num_cells):
+                if values[i]:
+                    continue
+                cands = full & ~(rows[cell_row[i]] | cols[cell_col[i]] | boxes[cell_box[i]])
+                if not cands:
+                    return None
+                if not cands & (cands - 1):
+                    self.place(state, i, cands)
+                    progress = True
+                    continue
+                count = bin(cands).count("1")
+                if count < best_count:
+                    best_cell, best_count = i, count
+            if progress:
+                continue
+
+            # Hidden singles: a digit that fits in only one cell of a unit
+            for unit in self.units:
+                once = twice = placed = 0
+                for i in unit:
+                    if values[i]:
+                        placed |= values[i]
+                        continue
+                    cands = full & ~(rows[cell_row[i]] | cols[cell_col[i]] | boxes[cell_box[i]])
+                    twice |= once & cands
+                    once |= cands
+                if (once | placed) != full:
+                    return None  # Some digit has no place left in this unit
+                hidden = once & ~twice & ~placed
+                while hidden:
+                    bit = hidden & -hidden
+                    hidden ^= bit
+                    for i in unit:
+                        if not values[i] and self.candidates(state, i) & bit:
+                            self.place(state, i, bit)
+                            break
+                    else:
+                        return None  # An earlier placement took the digit's only cell
+                    progress = True
+            if not progress:
+                return best_cell
+
+    def search(self, state, limit, solutions, rng=None):
+        # Depth-first search over MRV cells, collecting up to `limit` solutions
+        self.search_nodes += 1
+        cell = self.propagate(state)
+        if cell is None:
+            self.backtracks += 1
+            return
+        if cell == -1:
+            solutions.append(state[0][:])
+            return
+
+        cands = self.candidates(state, cell)
+        bits = []
+        while cands:
+            bit = cands & -cands
+            cands ^= bit
+            bits.append(bit)
+        if rng is not None:
+            rng.shuffle(bits)
+
+        values, rows, cols, boxes = state
+        for bit in bits:
+            child = (values[:], rows[:], cols[:], boxes[:])
+            self.place(child, cell, bit)
+            self.search(child, limit, solutions, rng)
+            if len(solutions) >= limit:
+                return
+
+    def to_grid(self, values):
+        # Convert a flat list of digit bits back into a list-of-lists grid
+        n = self.grid_size
+        return [[values[r * n + c].bit_length() for c in range(n)] for r in range(n)]
+
+    def solve(self, grid, limit=1, rng=None):
+        """
+        Return up to `limit` solutions of the grid as lists of lists.
+        When `rng` is given, candidate digits are tried in random order.
+        """
+        state = self.load(grid)
+        if state is None:
+            return []
+        solutions = []
+        self.search(state, limit, solutions, rng)
+        return [self.to_grid(values) for values in solutions]
+
+    def count_solutions(self, grid, limit=2):
+        """Count the solutions of the grid, stopping once `limit` are found."""
+        state = self.load(grid)
+        if state is None:
+            return 0
+        solutions = []
+        self.search(state, limit, solutions)
+        return len(solutions)
+
+    def has_unique_solution(self, grid):
+        """Check whether the grid has exactly one solution."""
+        return self.count_solutions(grid, limit=2) == 1
+
+    def fill_random(self, rng=random):
+        """Return a random complete grid."""
+        empty = [[0] * self.grid_size for _ in range(self.grid_size)]
+        return self.solve(empty, limit=1, rng=rng)[0]
+
+    def make_uniqueness_checker(self, solution):
+        """Return a UniquenessChecker for removing givens from the solution."""
+        return UniquenessChecker(self, solution)
+
+
+class UniquenessChecker:
+    """
+    Incremental uniqueness engine used while removing givens from a solved grid.
+
+    The checker keeps the solver state of the current givens and updates it in place
+    as cells are removed. Since the puzzle before a removal has exactly one solution,
+    the puzzle after removing a cell is still unique unless some solution puts a
+    different digit into that cell, so only that alternative is searched for.
+    """
+
+    def __init__(self, solver, solution):
+        self.solver = solver
+        self.state = solver.load(solution)
+        if self.state is None or 0 in self.state[0]:
+            raise ValueError("UniquenessChecker needs a complete, valid solution grid.")
+        self.solution = self.state[0][:]
+
+    def unplace(self, i):
+        # Clear cell i and release its digit in the cell's units
+        values, rows, cols, boxes = self.state
+        bit = values[i]
+        values[i] = 0
+        rows[self.solver.cell_row[i]] &= ~bit
+        cols[self.solver.cell_col[i]] &= ~bit
+        boxes[self.solver.cell_box[i]] &= ~bit
+
+    def has_alternative(self, i):
+        # Search for a solution of the current givens whose digit at cell i differs from the solution
+        values, rows, cols, boxes = self.state
+        cands = self.solver.candidates(self.state, i) & ~self.solution[i]
+        while cands:
+            bit = cands & -cands
+            cands ^= bit
+            child = (values[:], rows[:], cols[:], boxes[:])
+            self.solver.place(child, i, bit)
+            solutions = []
+            self.solver.search(child, 1, solutions)
+            if solutions:
+                return True
+        return False
+
+    def try_remove(self, row, col):
+        """
+        Remove the given at (row, col) if the puzzle stays unique.
+        Returns True if the cell was removed, False if it had to be kept.
+        """
+        i = row * self.solver.grid_size + col
+        if not self.state[0][i]:
+            return True
+        self.unplace(i)
+        if self.has_alternative(i):
+            self.restore(row, col)
+            return False
+        return True
+
+    def restore(self, row, col):
+        """Put the solution's digit back into (row, col); the puzzle stays unique."""
+        i = row * self.solver.grid_size + col
+        self.solver.place(self.state, i, self.solution[i])
@@ -0,0 +1,294 @@
+# Sudoku4LLM/token_budget.py
+
+import argparse
+import base64
+import json
+import math
+import os
+import re
+
+from config import SudokuConfig  # Rule texts per grid size
+from puzzle_io import JsonlPuzzleWriter, get_output_paths  # Streaming JSONL writer, per-input output files
+
+DEFAULT_CHARS_PER_TOKEN = 4  # Characters per token assumed without a vocab file
+# Approximation of the cl100k pre-tokenizer with the re module: contractions, words with
+# one leading non-letter, numbers of up to 3 digits, punctuation runs and whitespace
+PRETOKEN_PATTERN = re.compile(
+    r"'(?i:[sdmt]|ll|ve|re)|(?:[^\r\n\w]|_)?[^\W\d_]+|\d{1,3}| ?(?:[^\s\w]|_)+[\r\n]*|\s*[\r\n]+|\s+(?!\S)|\s+"
+)
+PROMPT_HEADER = "{rule}\n\nThe puzzles below are written in {format}. Solve each of them.\n\n"
+PUZZLE_LABEL = "Puzzle {number}:\n"
+PUZZLE_SEPARATOR = "\n\n"
+# Fields of converted records that are part of the prompt text rather than of the packed puzzle
+PROMPT_FIELDS = ("converted_puzzle", "format", "game_rule", "game_rule_id", "token_count")
+
+
+class TokenCounter:
+    """
+    Counts the tokens of a text, piece by piece.
+
+    Texts are split into pre-tokens with PRETOKEN_PATTERN and every distinct piece is
+    counted once: converted puzzles repeat the same few pieces (digits, separators,
+    keys), so after the first records nearly every piece is a dict lookup. Subclasses
+    implement count_piece; any object with a count(text) method can stand in for one.
+    """
+
+    name = "counter"
+
+    def __init__(self):
+        self.pieces = {}  # Token count per piece seen so far
+
+    def count_piece(self, piece):
+        raise NotImplementedError
+
+    def count(self, text):
+        """Return the number of tokens of text."""
+        pieces = self.pieces
+        total = 0
+        for piece in PRETOKEN_PATTERN.findall(text):
+            tokens = pieces.get(piece)
+            if tokens is None:
+                tokens = pieces[piece] = self.count_piece(piece)
+            total += tokens
+        return total
+
+
+class HeuristicTokenCounter(TokenCounter):
+    """Estimate without a vocab file: every piece costs one token per chars_per_token characters, rounded up."""
+
+    name = "heuristic"
+
+    def __init__(self, chars_per_token=DEFAULT_CHARS_PER_TOKEN):
+        super().__init__()
+        if chars_per_token <= 0:
+            raise ValueError("chars_per_token must be positive.")
+        self.chars_per_token = chars_per_token
+
+    def count_piece(self, piece):
+        return math.ceil(len(piece) / self.chars_per_token)
+
+
+class BpeTokenCounter(TokenCounter):
+    """
+    Byte-level BPE counts from a local rank file in the tiktoken format: one
+    "<base64 token> <rank>" pair per line, such as cl100k_base.tiktoken. Pieces are
+    merged pair by pair, lowest rank first, as the tokenizer does; no network access or
+    tokenizer package is needed. Texts are split with PRETOKEN_PATTERN, which only
+    approximates the tokenizer's pre-tokenization, so counts can be slightly off.
+    """
+
+    def __init__(self, path):
+        super().__init__()
+        self.name = os.path.basename(path)
+        self.ranks = {}
+        try:
+            with open(path, "rb") as file:
+                for line in file:
+                    if line.strip():
+                        token, rank = line.split()
+                        self.ranks[base64.b64decode(token)] = int(rank)
+        except OSError:
+            raise ValueError(f"Vocab file '{path}' cannot be read.")
+        except (ValueError, TypeError):
+            raise ValueError(f"Vocab file '{path}' is not a BPE rank file ('<base64 token> <rank>' per line).")
+        if not self.ranks:
+            raise ValueError(f"Vocab file '{path}' is empty.")
+
+    def count_piece(self, piece):
+        data = piece.encode("utf-8")
+        ranks = self.ranks
+        if data in ranks:
+            return 1
+        parts = [data[i:i + 1] for i in range(len(data))]
+        while len(parts) > 1:
+            best = None
+            for i in range(len(parts) - 1):
+                rank = ranks.get(parts[i] + parts[i + 1])
+                if rank is not None and (best is None or rank < best[0]):
+                    best = (rank, i)
+            if best is None:
+                break
+            i = best[1]
+            parts[i:i + 2] = [parts[i] + parts[i + 1]]
+        return len(parts)
+
+
+def get_token_counter(vocab=None, chars_per_token=DEFAULT_CHARS_PER_TOKEN):
+    """BPE counter for a local vocab file, or the character heuristic without one."""
+    if vocab is None:
+        return HeuristicTokenCounter(chars_per_token)
+    if not os.path.isfile(vocab):
+        raise ValueError(f"Vocab file '{vocab}' does not exist.")
+    return BpeTokenCounter(vocab)
+
+
+class PromptPacker:
+    """
+    Packs converted records into prompts of at most `budget` tokens.
+
+    Each prompt holds puzzles of one format and grid size: the rule text and a format
+    line once, then the labeled puzzles. The header costs the same for every prompt of a
+    (format, grid size), so it is counted once per pair and cached in `overheads`.
+    Records are packed greedily in input order and one open prompt is kept per pair, so
+    files of any size are packed in a single streaming pass. A finished prompt is
+    counted again as a whole, and puzzles that tipped it over the budget move on to the
+    next prompt. A puzzle that does not fit even alone gets a prompt of its own, marked
+    "over_budget".
+    """
+
+    def __init__(self, counter, budget, max_puzzles=None):
+        if budget < 1:
+            raise ValueError("The token budget must be at least 1.")
+        if max_puzzles is not None and max_puzzles < 1:
+            raise ValueError("max_puzzles must be at least 1.")
+        self.counter = counter
+        self.budget = budget
+        self.max_puzzles = max_puzzles
+        self.overheads = {}  # (format, grid size) -> (header text, header tokens)
+        self.separator_tokens = counter.count(PUZZLE_SEPARATOR)
+        self.pending = {}  # (format, grid size) -> [(record, puzzle tokens)] of the open prompt
+        self.puzzles = self.prompts = self.tokens = self.max_puzzle_tokens = 0
+
+    def overhead(self, record):
+        # Cached header of the record's (format, grid size)
+        grid_size = record["config"]["grid_size"]
+        key = (record["format"], grid_size)
+        if key not in self.overheads:
+            rule = record.get("game_rule") or SudokuConfig.get_rule(grid_size)
+            header = PROMPT_HEADER.format(rule=rule, format=record["format"])
+            self.overheads[key] = (header, self.counter.count(header))
+        return key, self.overheads[key]
+
+    def estimate(self, key, items):
+        # Tokens of a prompt of items, summed from its parts
+        count = self.counter.count
+        total = self.overheads[key][1] + self.separator_tokens * (len(items) - 1)
+        for number, (_, tokens) in enumerate(items, 1):
+            total += count(PUZZLE_LABEL.format(number=number)) + tokens
+        return total
+
+    def finish(self, key, items):
+        # Build the prompt of items; returns (prompt record, items left for the next prompt)
+        header = self.overheads[key][0]
+        leftovers = []
+        while True:
+            prompt = header + PUZZLE_SEPARATOR.join(
+                PUZZLE_LABEL.format(number=number) + record["converted_puzzle"]
+                for number, (record, _) in enumerate(items, 1)
+            )
+            tokens = self.counter.count(prompt)
+            if tokens <= self.budget or len(items) == 1:
+                break
+            leftovers.insert(0, items.pop())
+        self.prompts += 1
+        self.tokens += tokens
+        return {
+            "prompt": prompt,
+            "token_count": tokens,
+            "num_puzzles": len(items),
+            "format": key[0],
+            "grid_size": key[1],
+            "over_budget": tokens > self.budget,
+            "puzzles": [
+                {name: value for name, value in record.items() if name not in PROMPT_FIELDS}
+                for record, _ in items
+            ],
+        }, leftovers
+
+    def add(self, record):
+        """Add a converted record; returns the list of prompts it completed (often empty)."""
+        key, _ = self.overhead(record)
+        tokens = self.counter.count(record["converted_puzzle"])
+        self.puzzles += 1
+        self.max_puzzle_tokens = max(self.max_puzzle_tokens, tokens)
+
+        pending = self.pending.setdefault(key, [])
+        pending.append((record, tokens))
+        prompts = []
+        while pending:
+            over = self.estimate(key, pending) > self.budget
+            if not over and (self.max_puzzles is None or len(pending) < self.max_puzzles):
+                break
+            # Close the prompt without the record that overflowed it, or with all when full
+            take = len(pending) - 1 if over and len(pending) > 1 else len(pending)
+            prompt, leftovers = self.finish(key, pending[:take])
+            prompts.append(prompt)
+            pending[:] = leftovers + pending[take:]
+        return prompts
+
+    def flush(self):
+        """Close every open prompt; returns the finished prompts."""
+        prompts = []
+        for key, pending in self.pending.items():
+            while pending:
+                prompt, pending = self.finish(key, pending)
+                prompts.append(prompt)
+        self.pending = {}
+        return prompts
+
+
+def pack_file(input_jsonl, output_jsonl, packer):
+    """Pack the records of a converted JSONL file into prompts written to output_jsonl. Returns the prompt count."""
+    written = 0
+    with open(input_jsonl, "r") as file, JsonlPuzzleWriter(output_jsonl) as writer:
+        for line in file:
+            for prompt in packer.add(json.loads(line)):
+                writer.write(prompt)
+                written += 1
+        for prompt in packer.flush():
+            writer.write(prompt)
+            written += 1
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Pack converted Sudoku puzzles into prompts that fit a token budget."
+    )
+    parser.add_argument("inputs", nargs="+", help="Converted JSONL files (see format_convertor.py).")
+    parser.add_argument("--budget", type=int, required=True, help="Maximum tokens per prompt.")
+    parser.add_argument("--output-path", required=True, help="Directory for the packed files.")
+    parser.add_argument("--vocab", default=None,
+                        help="Local BPE rank file, e.g. cl100k_base.tiktoken (default: character heuristic).")
+    parser.add_argument("--chars-per-token", type=float, default=DEFAULT_CHARS_PER_TOKEN,
+                        help="Characters per token of the heuristic (default: %(default)s).")
+    parser.add_argument("--max-puzzles", type=int, default=None, help="Maximum puzzles per prompt.")
+    args = parser.parse_args(argv)
+
+    try:
+        counter = get_token_counter(args.vocab, args.chars_per_token)
+    except ValueError as e:
+        print(f"Error: {e}")
+        exit(1)
+
+    for input_jsonl in args.inputs:
+        if not os.path.isfile(input_jsonl):
+            print(f"Error: File '{input_jsonl}' does not exist.")
+            exit(1)
+    try:
+        output_paths = get_output_paths(args.inputs, args.output_path, "packed_")
+    except ValueError as e:
+        print(f"Error: {e}")
+        exit(1)
+
+    os.makedirs(args.output_path, exist_ok=True)
+    for input_jsonl, output_jsonl in zip(args.inputs, output_paths):
+        try:
+            packer = PromptPacker(counter, args.budget, args.max_puzzles)
+            prompts = pack_file(input_jsonl, output_jsonl, packer)
+        except (json.JSONDecodeError, KeyError):
+            print(f"Error: File '{input_jsonl}' is not a converted JSONL file.")
+            exit(1)
+        except ValueError as e:
+            print(f"Error: {e}")
+            exit(1)
+        if not packer.puzzles:
+            print(f"{input_jsonl}: no puzzles.")
+            continue
+        print(f"{input_jsonl}: {packer.puzzles} puzzles (mean {packer.tokens / packer.puzzles:.0f} prompt tokens "
+              f"per puzzle, largest puzzle {packer.max_puzzle_tokens} tokens) in {prompts} prompts, "
+              f"{packer.tokens / (prompts * args.budget):.0%} of the budget used -> {output_jsonl}")
+
+
+if __name__ == "__main__":
+    main()